@@ -1,8 +1,10 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
 import folium
 from streamlit_folium import st_folium
+from folium.plugins import HeatMap
 from datetime import datetime
 import os
 from PIL import Image
@@ -13,8 +15,55 @@ import zipfile
 import re
 import gspread
 import time
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import multiprocessing
 from streamlit_js_eval import get_geolocation
 from google.oauth2 import service_account
+from survey_store import (
+    SHEET_ID,
+    SURVEY_COLUMNS,
+    SYNC_BLOCK_SIZE,
+    append_local_values,
+    apply_survey_schema,
+    checksum_of,
+    current_season,
+    data_version,
+    get_local_data_path,
+    keyed_survey_rows,
+    layout_version,
+    local_file_lock,
+    parse_survey_dates,
+    read_local_values,
+    read_latest_snapshot,
+    read_snapshot_manifest,
+    reconcile_surveys,
+    record_season,
+    rows_to_frame,
+    season_worksheet,
+    serialize_survey_frame,
+    shard_season,
+    write_local_values,
+    write_sheet_rows_by_key,
+    write_snapshot,
+)
+from reports import REPORTS_DIR, plan_reports, render_report
+from survey_views import (
+    ENTRY_CONTEXT_COLUMNS,
+    KM_PER_DEGREE,
+    TREND_FREQUENCIES,
+    DiseaseIndex,
+    SpatialGridIndex,
+    build_season_comparison,
+    build_trend_view,
+    carry_forward_filtered_views,
+    fold_trend_aggregates,
+    survey_filter_mask,
+)
+
+script_started = time.perf_counter()
 
 # -------------------------------
 # Page config (must be before any Streamlit UI code)
@@ -88,7 +137,6 @@ def get_spreadsheet():
     if not client:
         return None
 
-    SHEET_ID = "15D6_hA_LhG6M8CKMUFikCxXPQNtxhNBSCykaBF2egtE"
     try:
         spreadsheet = client.open_by_key(SHEET_ID)
         return spreadsheet
@@ -115,7 +163,6 @@ def init_google_sheets():
             )
 
         client = gspread.authorize(creds)
-        SHEET_ID = "15D6_hA_LhG6M8CKMUFikCxXPQNtxhNBSCykaBF2egtE"
         spreadsheet = client.open_by_key(SHEET_ID)
         return spreadsheet
 
@@ -124,56 +171,97 @@ def init_google_sheets():
         st.warning("⚠️ No cloud data available for synchronization. Using local storage.")
         return None
 
+# -------------------------------
+# Season-sharded worksheets: one tab per year, closed seasons are read once per process
+SHARD_FETCH_WORKERS = 4
+
+@st.cache_resource
+def get_closed_season_cache():
+    """Records of closed seasons already read from Sheets, keyed by season"""
+    return {"lock": threading.Lock(), "records": {}}
+
+def forget_closed_seasons(seasons):
+    """Drop cached closed seasons after writing to their tabs"""
+    cache = get_closed_season_cache()
+    with cache["lock"]:
+        for season in seasons:
+            cache["records"].pop(season, None)
+
+def read_worksheets(worksheets, read):
+    """Apply `read` to every worksheet concurrently; results come back in the same order"""
+    if not worksheets:
+        return []
+    with ThreadPoolExecutor(max_workers=min(SHARD_FETCH_WORKERS, len(worksheets))) as executor:
+        return list(executor.map(read, worksheets))
+
+def split_worksheets(spreadsheet):
+    """(the pre-sharding first worksheet or None, {season: worksheet})"""
+    worksheets = spreadsheet.worksheets()
+    shards = {shard_season(ws.title): ws for ws in worksheets if shard_season(ws.title) is not None}
+    legacy = worksheets[0] if worksheets and shard_season(worksheets[0].title) is None else None
+    return legacy, shards
+
 def save_to_google_sheets(new_row: dict):
-    """Save data to Google Sheets with proper error handling"""
+    """Append a record to the worksheet of its season"""
     try:
         spreadsheet = get_spreadsheet()
         if not spreadsheet:
             st.warning("⚠️ No cloud data available for synchronization.")
             return False
 
-        worksheet = spreadsheet.sheet1
-        existing_values = worksheet.get_all_values()
-        
-        # Add headers if sheet is empty
-        if not existing_values:
-            headers = list(new_row.keys())
-            worksheet.append_row(headers)
-        
+        season = record_season(new_row.get("date"))
+        worksheet = season_worksheet(spreadsheet, season, list(new_row.keys()))
+
         # Append row values (convert all to strings)
         values = [str(v) for v in new_row.values()]
         worksheet.append_row(values, value_input_option="USER_ENTERED")
-        
+        forget_closed_seasons([season])
+
         return True
-        
+
     except Exception as e:
         st.error(f"Error saving to Google Sheets: {e}")
         return False
 
+def read_sheet_records(spreadsheet, closed_seasons):
+    """All records in the sheet, re-reading only the current season (and any unsharded rows); raises on failure"""
+    legacy, shards = split_worksheets(spreadsheet)
+    with closed_seasons["lock"]:
+        cached = {season: records for season, records in closed_seasons["records"].items() if season in shards}
+
+    # Closed seasons are fetched once; the open season and the old first sheet every time
+    to_read = [ws for season, ws in sorted(shards.items()) if season >= current_season() or season not in cached]
+    if legacy is not None:
+        to_read.append(legacy)
+    fetched = dict(zip([ws.title for ws in to_read], read_worksheets(to_read, lambda ws: ws.get_all_records())))
+
+    with closed_seasons["lock"]:
+        for season, ws in shards.items():
+            if season < current_season() and ws.title in fetched:
+                closed_seasons["records"][season] = fetched[ws.title]
+
+    records = fetched.get(legacy.title, []) if legacy is not None else []
+    for season, ws in sorted(shards.items()):
+        records = records + (cached[season] if season in cached else fetched[ws.title])
+    return pd.DataFrame(records)
+
 def load_from_google_sheets():
-    """Load all data from Google Sheets"""
+    """Load all data from Google Sheets, re-reading only the current season (and any unsharded rows)"""
     spreadsheet = get_spreadsheet()
     if spreadsheet:
         try:
-            worksheet = spreadsheet.sheet1
-            records = worksheet.get_all_records()
-            if records:
-                return pd.DataFrame(records)
+            return read_sheet_records(spreadsheet, get_closed_season_cache())
         except Exception as e:
             st.error(f"Error loading from Google Sheets: {e}")
     return pd.DataFrame()
 
 # -------------------------------
 # Improved data persistence functions
-def get_local_data_path():
-    """Get the path to the local data file with proper handling for cloud deployments"""
-    return os.path.join("data", "local_disease_data.csv")
-
 def save_local_data(df):
     """Save local data with error handling"""
     try:
-        local_path = get_local_data_path()
-        df.to_csv(local_path, index=False)
+        # Stored text layout (dd/mm/YYYY, 6-decimal coordinates) so the next load reads the same values back
+        write_local_values(df)
         return True
     except Exception as e:
         st.error(f"Error saving data: {e}")
@@ -181,31 +269,20 @@ def save_local_data(df):
 
 def load_local_data():
     """Load local data with error handling"""
-    local_path = get_local_data_path()
-    if os.path.exists(local_path):
-        try:
-            return pd.read_csv(local_path)
-        except Exception as e:
-            st.error(f"Error loading local data: {e}")
-            return pd.DataFrame()
-    return pd.DataFrame()
+    try:
+        return read_local_data()
+    except Exception as e:
+        st.error(f"Error loading local data: {e}")
+        return pd.DataFrame()
 
 def save_data(new_row):
     """Save data to both local storage and Google Sheets"""
     # First save to Google Sheets
     gs_success = save_to_google_sheets(new_row)
     
-    # Then save to local storage as backup
-    file_path = "data/local_disease_data.csv"
-    
+    # Then save to local storage as backup (atomic append in the stored text layout, under the local file lock)
     try:
-        if os.path.exists(file_path):
-            df = pd.read_csv(file_path)
-            df = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True)
-        else:
-            df = pd.DataFrame([new_row])
-        
-        df.to_csv(file_path, index=False)
+        append_local_values(pd.DataFrame([new_row]))
         local_success = True
     except Exception as e:
         st.error(f"Error saving to local storage: {e}")
@@ -246,30 +323,175 @@ def get_next_sample_id():
     return f"SARDI{max_num + 1:05d}"
 
 # -------------------------------
-# Load data with caching
-@st.cache_data(ttl=300)
-def load_data():
-    """Load the most recent data, prioritizing Google Sheets but merging with local if needed."""
-    df_local = pd.DataFrame()
-    df_gs = pd.DataFrame()
+# Local/cloud synchronization (dry run first, then only the differing rows are written)
+SYNC_DIRECTIONS = {
+    "Both ways (cloud wins conflicts)": {"push_new": True, "push_changed": False, "pull_new": True, "pull_changed": True},
+    "Local → Cloud only (local wins conflicts)": {"push_new": True, "push_changed": True, "pull_new": False, "pull_changed": False},
+    "Cloud → Local only (cloud wins conflicts)": {"push_new": False, "push_changed": False, "pull_new": True, "pull_changed": True},
+}
 
-    # Try load from Google Sheets
+def read_cloud_sheets(spreadsheet):
+    """[(worksheet, values)] for the unsharded first sheet and every season tab, read concurrently"""
+    legacy, shards = split_worksheets(spreadsheet)
+    worksheets = ([legacy] if legacy is not None else []) + [shards[season] for season in sorted(shards)]
+    return list(zip(worksheets, read_worksheets(worksheets, lambda ws: ws.get_all_values())))
+
+def cloud_sheets_frame(sheets):
+    """All cloud rows from read_cloud_sheets() as one string frame"""
+    frames = [rows_to_frame(values) for _, values in sheets if len(values) > 1]
+    return pd.concat(frames, ignore_index=True) if frames else rows_to_frame([])
+
+def plan_sync():
+    """Compare the local file with the Google Sheet; returns the reconciliation plan or None without a sheet"""
+    spreadsheet = get_spreadsheet()
+    if not spreadsheet:
+        return None
+    cloud_df = cloud_sheets_frame(read_cloud_sheets(spreadsheet))
+    return reconcile_surveys(read_local_values(), cloud_df)
+
+def write_rows_by_key(spreadsheet, rows, deleted_keys=(), sheets=None):
+    """Write normalized `rows` by sample ID and delete `deleted_keys`; returns (appended, updated, deleted)"""
+    if sheets is None:
+        sheets = read_cloud_sheets(spreadsheet)
+    return write_sheet_rows_by_key(spreadsheet, sheets, rows, deleted_keys, forget_seasons=forget_closed_seasons)
+
+def push_rows_to_cloud(plan, new_rows, changed_rows):
+    """Write `new_rows` and `changed_rows` to the sheet by sample ID; returns (appended, updated)"""
+    spreadsheet = get_spreadsheet()
+    sheets = read_cloud_sheets(spreadsheet)
+    _, cloud_hashes = keyed_survey_rows(cloud_sheets_frame(sheets))
+    if checksum_of(cloud_hashes) != plan["cloud_checksum"]:
+        raise RuntimeError("the Google Sheet changed since the comparison; compare again")
+
+    appended, updated, _ = write_rows_by_key(spreadsheet, pd.concat([changed_rows, new_rows]), sheets=sheets)
+    return appended, updated
+
+def pull_rows_to_local(plan, new_rows, changed_rows):
+    """Append `new_rows` and overwrite `changed_rows` in the local file, leaving other rows untouched"""
+    with local_file_lock:
+        local = read_local_values()
+        _, local_hashes = keyed_survey_rows(local)
+        if checksum_of(local_hashes) != plan["local_checksum"]:
+            raise RuntimeError("the local data changed since the comparison; compare again")
+
+        columns = list(local.columns) + [col for col in SURVEY_COLUMNS if col not in local.columns]
+        local = local.reindex(columns=columns, fill_value="")
+        if not changed_rows.empty:
+            local_ids = local["sample_id"].str.strip()
+            for key, row in changed_rows.iterrows():
+                local.loc[local_ids == key, SURVEY_COLUMNS] = row[SURVEY_COLUMNS].tolist()
+        local = pd.concat([local, new_rows.reindex(columns=columns, fill_value="")], ignore_index=True)
+
+        write_local_values(local)
+    return len(new_rows), len(changed_rows)
+
+# -------------------------------
+# Columnar snapshots (Arrow IPC, memory-mapped on cold start)
+SNAPSHOT_RECONCILE_INTERVAL = 300  # seconds, matches the load_data() cache ttl
+
+def save_snapshot(df):
+    """Write a snapshot of `df`, warning instead of failing the load"""
     try:
-        df_gs = load_from_google_sheets()
-        if not df_gs.empty:
-            # Save cloud data to local as backup
-            save_local_data(df_gs)
+        return write_snapshot(df)
     except Exception as e:
-        st.warning(f"⚠️ Could not load from Google Sheets: {e}")
+        st.warning(f"Could not write data snapshot: {e}")
+        return None
+
+def load_latest_snapshot():
+    """Memory-map the latest snapshot; returns (DataFrame, version) or (empty DataFrame, None)"""
+    try:
+        return read_latest_snapshot()
+    except Exception as e:
+        st.warning(f"Could not read data snapshot: {e}")
+        return pd.DataFrame(), None
 
-    # Try load from local
-    df_local = load_local_data()
+@st.cache_resource
+def get_reconcile_state():
+    """Process-wide state of the background Sheets reconciliation"""
+    return {
+        "lock": threading.Lock(),
+        "thread": None,
+        "started_at": 0.0,
+        "finished_at": None,
+        "status": None,  # "running", "finished" or "failed"
+        "error": None,
+        "version": None,
+        "caches_cleared": True,
+    }
+
+def run_background_reconcile(state, client, closed_seasons):
+    """Reload from Sheets + local storage off the script thread into a new snapshot (no Streamlit calls here)"""
+    try:
+        df_gs = read_sheet_records(client.open_by_key(SHEET_ID), closed_seasons)
+        backup_cloud_only_rows(df_gs)
+        manifest = write_snapshot(merge_survey_frames(df_gs, read_local_data()))
+        outcome = {"status": "finished", "error": None, "version": manifest["version"] if manifest else None}
+    except Exception as e:
+        outcome = {"status": "failed", "error": str(e), "version": None}
+    with state["lock"]:
+        state.update(outcome, finished_at=time.time(), caches_cleared=outcome["status"] != "finished")
 
-    # --- Merge logic ---
+def start_background_reconcile():
+    """Start a background reconciliation unless one is running or finished recently"""
+    client = get_gs_client()
+    if not client:
+        return
+    state = get_reconcile_state()
+    with state["lock"]:
+        if state["thread"] is not None and state["thread"].is_alive():
+            return
+        if time.time() - state["started_at"] < SNAPSHOT_RECONCILE_INTERVAL:
+            return
+        state["started_at"] = time.time()
+        state["status"] = "running"
+        # Cached resources are looked up here, on the script thread, and handed to the worker
+        state["thread"] = threading.Thread(
+            target=run_background_reconcile,
+            args=(state, client, get_closed_season_cache()),
+            name="sheets-reconcile",
+            daemon=True,
+        )
+        state["thread"].start()
+
+def clear_caches_after_reconcile():
+    """On the script thread: drop load_data()'s cached frame once a background reconcile has finished"""
+    state = get_reconcile_state()
+    with state["lock"]:
+        pending = not state["caches_cleared"]
+        state["caches_cleared"] = True
+    if pending:
+        load_data.clear()
+
+# -------------------------------
+# Load data with caching
+def read_local_data():
+    """Local data file with pandas' default parsing (empty frame if missing); raises on an unreadable file"""
+    local_path = get_local_data_path()
+    if os.path.exists(local_path):
+        return pd.read_csv(local_path)
+    return pd.DataFrame()
+
+def backup_cloud_only_rows(df_gs):
+    """Append the records only the cloud has to the local file; local-only rows and local edits are left for Sync"""
+    if df_gs.empty:
+        return 0
+    # The lock spans the comparison too, so a Save between it and the write is never lost or refused
+    with local_file_lock:
+        plan = reconcile_surveys(read_local_values(), df_gs)
+        if plan["cloud_only"].empty:
+            return 0
+        return pull_rows_to_local(plan, plan["cloud_only"], plan["cloud_only"].iloc[:0])[0]
+
+def merge_survey_frames(df_gs, df_local):
+    """Typed union of the cloud and local records; the cloud copy of a sample ID wins, local-only rows are kept"""
     if df_local.empty and df_gs.empty:
         return pd.DataFrame()
 
     if not df_local.empty and not df_gs.empty:
+        if "sample_id" in df_gs.columns and "sample_id" in df_local.columns:
+            # Local edits to cloud records are pushed by Sync, not shown as if they were saved
+            cloud_ids = set(df_gs["sample_id"].astype(str).str.strip())
+            df_local = df_local[~df_local["sample_id"].astype(str).str.strip().isin(cloud_ids)]
         df_combined = pd.concat([df_gs, df_local], ignore_index=True)
         if "sample_id" in df_combined.columns:
             df_combined = df_combined.drop_duplicates(subset=["sample_id"], keep="last")
@@ -278,45 +500,70 @@ def load_data():
     else:
         df_combined = df_gs
 
-    # --- Robust date parsing ---
-    date_columns = [col for col in df_combined.columns if 'date' in col.lower()]
-    
-    for date_col in date_columns:
-        if date_col in df_combined.columns:
-            # Try multiple date formats
-            try:
-                df_combined[date_col] = pd.to_datetime(
-                    df_combined[date_col], 
-                    errors='coerce', 
-                    dayfirst=True,
-                    format='mixed'
-                )
-            except:
-                try:
-                    # Try different parsing approach
-                    df_combined[date_col] = pd.to_datetime(
-                        df_combined[date_col], 
-                        errors='coerce'
-                    )
-                except:
-                    st.warning(f"Could not parse date column: {date_col}")
-            
-            # If still not datetime, try manual conversion
-            if not pd.api.types.is_datetime64_any_dtype(df_combined[date_col]):
-                try:
-                    df_combined[date_col] = pd.to_datetime(
-                        df_combined[date_col].astype(str), 
-                        errors='coerce',
-                        dayfirst=True
-                    )
-                except:
-                    pass
+    # --- Date parsing: dd/mm/YYYY as stored, strict ISO for older rewrites (never guess day/month order) ---
+    if "date" in df_combined.columns:
+        df_combined["date"] = parse_survey_dates(df_combined["date"])
+
+    # Compact dtypes once at load so every session holds the smaller frame
+    return apply_survey_schema(df_combined)
+
+def fetch_and_merge_data():
+    """Load Google Sheets and local data and merge them; the cloud wins conflicts and local-only rows are never dropped."""
+    df_gs = pd.DataFrame()
+
+    # Try load from Google Sheets
+    try:
+        df_gs = load_from_google_sheets()
+    except Exception as e:
+        st.warning(f"⚠️ Could not load from Google Sheets: {e}")
+
+    # The cloud copy must not replace rows only this machine has: back up just the cloud-only records
+    try:
+        backup_cloud_only_rows(df_gs)
+    except Exception as e:
+        st.warning(f"⚠️ Could not back up cloud records locally: {e}")
+
+    df_combined = merge_survey_frames(df_gs, load_local_data())
+
+    # Snapshot the typed frame so the next cold start does not wait for Sheets
+    if not df_combined.empty:
+        save_snapshot(df_combined)
 
     return df_combined
 
-# Initialize session state
+@st.cache_data(ttl=300)
+def load_data():
+    """Cached wrapper around fetch_and_merge_data()"""
+    return fetch_and_merge_data()
+
+def set_session_data(df):
+    """Swap in a survey frame and fingerprint it once here, instead of on every rerun"""
+    st.session_state.df = df
+    st.session_state.data_ver = data_version(df)
+    # Caches of row positions need the row order too: sessions can hold the same rows in different orders
+    st.session_state.layout_ver = layout_version(df)
+
+# A finished background reconcile makes the cached load stale
+clear_caches_after_reconcile()
+
+# Initialize session state: serve the latest snapshot at once and reconcile with Sheets in the background
 if "df" not in st.session_state:
-    st.session_state.df = load_data()
+    snapshot_df, snapshot_version = load_latest_snapshot()
+    if not snapshot_df.empty:
+        set_session_data(snapshot_df)
+        st.session_state.snapshot_version = snapshot_version
+        start_background_reconcile()
+    else:
+        set_session_data(load_data())
+        st.session_state.snapshot_version = (read_snapshot_manifest() or {}).get("version")
+else:
+    # Pick up a newer snapshot written by a background reconcile or another session's reload
+    latest_manifest = read_snapshot_manifest()
+    if latest_manifest and latest_manifest["version"] != st.session_state.get("snapshot_version"):
+        snapshot_df, snapshot_version = load_latest_snapshot()
+        if not snapshot_df.empty:
+            set_session_data(snapshot_df)
+            st.session_state.snapshot_version = snapshot_version
 
 def reload_data():
     """Force reload data from all sources"""
@@ -327,30 +574,398 @@ def reload_data():
         # Reload data
         new_data = load_data()
         
-        # Ensure date columns are properly formatted
-        date_columns = [col for col in new_data.columns if 'date' in col.lower()]
-        for date_col in date_columns:
-            if date_col in new_data.columns:
-                if not pd.api.types.is_datetime64_any_dtype(new_data[date_col]):
-                    new_data[date_col] = pd.to_datetime(new_data[date_col], errors='coerce')
+        # Ensure the date column is parsed
+        if "date" in new_data.columns:
+            new_data["date"] = parse_survey_dates(new_data["date"])
         
-        st.session_state.df = new_data
+        set_session_data(new_data)
+        st.session_state.snapshot_version = (read_snapshot_manifest() or {}).get("version")
         
         st.success("Data reloaded successfully!")
         st.rerun()  # Force UI refresh
     except Exception as e:
         st.error(f"Error reloading data: {e}")
 
+# -------------------------------
+# Severity trends (aggregates shared by sessions; the bucketing lives in survey_views)
+MAX_TREND_VERSIONS = 4  # sessions on different data versions keep their aggregates instead of evicting each other
+
+@st.cache_resource
+def get_trend_store():
+    """Process-wide trend aggregates for the most recently used data versions"""
+    return {"lock": threading.Lock(), "entries": OrderedDict()}
+
+def get_trend_aggregates(df, version):
+    """Return trend aggregates for `df`, folding in only new submissions when possible"""
+    store = get_trend_store()
+    with store["lock"]:
+        return fold_trend_aggregates(store["entries"], df, version, MAX_TREND_VERSIONS)
+
+# -------------------------------
+# Spatial index for "nearby reports" (grid in survey_views, shared by sessions)
+@st.cache_resource(max_entries=2)
+def get_spatial_index(layout, _df):
+    """Spatial index for the current layout_version() (it holds row positions, so the row order is part of the key)"""
+    return SpatialGridIndex(_df)
+
+# -------------------------------
+# Disease index (built in survey_views, shared by sessions)
+@st.cache_resource(max_entries=2)
+def get_disease_index(layout, _df):
+    """Disease index for the current layout_version() (built once, shared by sessions with the same row order)"""
+    return DiseaseIndex(_df)
+
+# -------------------------------
+# Shared filtered views (one computation per filter and data version across all sessions)
+FILTERED_VIEW_CACHE_BYTES = 256 * 1024 ** 2
+
+@st.cache_resource
+def get_filtered_view_cache():
+    """Process-wide LRU of filtered views, bounded by memory; oldest views are evicted first"""
+    return {
+        "lock": threading.Lock(),
+        "views": OrderedDict(),
+        "bytes": 0,
+        "hits": 0,
+        "misses": 0,
+        "evictions": 0,
+        "carried": 0,
+        # Submissions since `pending_since`; views they do not match survive the version change
+        "pending_since": None,
+        "pending": [],
+    }
+
+def build_filtered_view(df, version, layout, crop, disease, start, end):
+    """Filtered rows and disease entries plus the metrics and map inputs derived from them"""
+    disease_index = get_disease_index(layout, df)
+    mask = survey_filter_mask(df, crop, disease, start, end, disease_index)
+    df_filtered = df[mask]
+
+    # Entries carry their survey's context so they stay valid without positions into `df`
+    entries = disease_index.entries(mask, disease)
+    context = df.iloc[entries["row"].to_numpy(dtype=np.int64)][[col for col in ENTRY_CONTEXT_COLUMNS if col in df.columns]]
+    entries = pd.concat(
+        [entries.drop(columns="row").reset_index(drop=True), context.reset_index(drop=True)], axis=1
+    )
+
+    severity = entries["severity"]
+    lats = df_filtered["latitude"].to_numpy(dtype="float64", na_value=np.nan)
+    lons = df_filtered["longitude"].to_numpy(dtype="float64", na_value=np.nan)
+    return {
+        "key": (version, crop, disease, str(start), str(end)),
+        "df": df_filtered,
+        "entries": entries,
+        "max_severity": int(severity.max()) if severity.notna().any() else 0,
+        "mean_severity": round(float(severity.mean()), 1) if severity.notna().any() else 0.0,
+        "lats": lats,
+        "lons": lons,
+        "nbytes": int(df_filtered.memory_usage(deep=True).sum() + entries.memory_usage(deep=True).sum())
+        + lats.nbytes + lons.nbytes,
+    }
+
+def invalidate_filtered_views(record, version):
+    """Note a submitted record so only the views it matches are recomputed for the next data version"""
+    cache = get_filtered_view_cache()
+    with cache["lock"]:
+        if cache["pending_since"] is None:
+            cache["pending_since"] = version
+        cache["pending"].append(record)
+
+def get_filtered_view(df, version, layout, crop, disease, start, end):
+    """Cached filtered view for (crop, disease, date range, data version), shared by all sessions"""
+    cache = get_filtered_view_cache()
+    key = (version, crop, disease, str(start), str(end))
+    with cache["lock"]:
+        if key not in cache["views"]:
+            carry_forward_filtered_views(cache, df, version)
+        view = cache["views"].get(key)
+        if view is not None:
+            cache["views"].move_to_end(key)
+            cache["hits"] += 1
+            return view
+        cache["misses"] += 1
+
+    view = build_filtered_view(df, version, layout, crop, disease, start, end)
+    with cache["lock"]:
+        if key not in cache["views"]:
+            cache["views"][key] = view
+            cache["bytes"] += view["nbytes"]
+        while cache["bytes"] > FILTERED_VIEW_CACHE_BYTES and len(cache["views"]) > 1:
+            _, evicted = cache["views"].popitem(last=False)
+            cache["bytes"] -= evicted["nbytes"]
+            cache["evictions"] += 1
+    return view
+
+def filtered_view_stats():
+    """Snapshot of the shared view cache counters"""
+    cache = get_filtered_view_cache()
+    with cache["lock"]:
+        lookups = cache["hits"] + cache["misses"]
+        return {
+            "entries": len(cache["views"]),
+            "mb": cache["bytes"] / 1024 ** 2,
+            "hits": cache["hits"],
+            "misses": cache["misses"],
+            "hit_rate": cache["hits"] / lookups if lookups else 0.0,
+            "evictions": cache["evictions"],
+            "carried": cache["carried"],
+        }
+
+# -------------------------------
+# Severity heatmap
+def gaussian_smoothing_matrix(n_cells, sigma_cells):
+    """Dense (n x n) Gaussian kernel so a whole grid axis is smoothed with one matrix product"""
+    offsets = np.arange(n_cells)[:, None] - np.arange(n_cells)[None, :]
+    kernel = np.exp(-0.5 * (offsets / max(sigma_cells, 1e-6)) ** 2)
+    kernel[np.abs(offsets) > 4 * sigma_cells + 1] = 0.0
+    return kernel
+
+@st.cache_data(max_entries=32)
+def compute_severity_heatmap(version, crop, disease, start, end, _entries, bandwidth_km=15.0, max_cells=150):
+    """Severity-weighted kernel density of disease reports (all slots) on a lat/lon grid (cached per filter and data version)"""
+    entries = _entries
+    if entries.empty:
+        return None
+
+    lats = entries["latitude"].to_numpy(dtype="float64", na_value=np.nan)
+    lons = entries["longitude"].to_numpy(dtype="float64", na_value=np.nan)
+    weights = entries["severity"].to_numpy(dtype="float64", na_value=np.nan)
+    valid = np.isfinite(lats) & np.isfinite(lons) & ~((lats == 0) & (lons == 0)) & (np.nan_to_num(weights) > 0)
+    if not valid.any():
+        return None
+    lats, lons, weights = lats[valid], lons[valid], weights[valid]
+
+    # Pad the extent so the kernel tails of edge reports stay on the grid
+    km_per_deg_lon = KM_PER_DEGREE * max(np.cos(np.radians(lats.mean())), 1e-6)
+    pad_lat = 3 * bandwidth_km / KM_PER_DEGREE
+    pad_lon = 3 * bandwidth_km / km_per_deg_lon
+    lat_range = (lats.min() - pad_lat, lats.max() + pad_lat)
+    lon_range = (lons.min() - pad_lon, lons.max() + pad_lon)
+
+    # Cells of roughly a third of the bandwidth, capped so the grid stays small
+    cell_km = bandwidth_km / 3
+    n_lat = int(np.clip((lat_range[1] - lat_range[0]) * KM_PER_DEGREE / cell_km, 8, max_cells))
+    n_lon = int(np.clip((lon_range[1] - lon_range[0]) * km_per_deg_lon / cell_km, 8, max_cells))
+
+    binned, lat_edges, lon_edges = np.histogram2d(
+        lats, lons, bins=[n_lat, n_lon], range=[lat_range, lon_range], weights=weights
+    )
+    sigma_lat = bandwidth_km / ((lat_edges[1] - lat_edges[0]) * KM_PER_DEGREE)
+    sigma_lon = bandwidth_km / ((lon_edges[1] - lon_edges[0]) * km_per_deg_lon)
+    density = gaussian_smoothing_matrix(n_lat, sigma_lat) @ binned @ gaussian_smoothing_matrix(n_lon, sigma_lon).T
+
+    peak = density.max()
+    if peak <= 0:
+        return None
+    return {
+        "density": density / peak,
+        "lat_edges": lat_edges,
+        "lon_edges": lon_edges,
+        "n_reports": int(valid.sum()),
+    }
+
+def heatmap_points(heatmap, min_intensity=0.05):
+    """[lat, lon, intensity] at the centre of every cell worth drawing"""
+    lat_centres = (heatmap["lat_edges"][:-1] + heatmap["lat_edges"][1:]) / 2
+    lon_centres = (heatmap["lon_edges"][:-1] + heatmap["lon_edges"][1:]) / 2
+    rows, cols = np.nonzero(heatmap["density"] >= min_intensity)
+    return np.column_stack([lat_centres[rows], lon_centres[cols], heatmap["density"][rows, cols]]).tolist()
+
+def heatmap_hotspots(heatmap, threshold):
+    """Bounds and intensity of every cell at or above `threshold` (fraction of the peak)"""
+    lat_edges, lon_edges = heatmap["lat_edges"], heatmap["lon_edges"]
+    rows, cols = np.nonzero(heatmap["density"] >= threshold)
+    return [
+        ([[lat_edges[r], lon_edges[c]], [lat_edges[r + 1], lon_edges[c + 1]]], float(heatmap["density"][r, c]))
+        for r, c in zip(rows, cols)
+    ]
+
+# -------------------------------
+# Viewport-culled map markers
+MAP_DEFAULT_CENTER = (-34.96, 138.63)
+MAP_DEFAULT_ZOOM = 6
+MAP_WIDTH_PX, MAP_HEIGHT_PX = 800, 450
+VIEWPORT_MARGIN = 0.25  # extra fraction of the viewport loaded on every side
+MAX_CACHED_TILES = 4000
+
+def viewport_from_map_state(map_state):
+    """(south, west, north, east) and zoom from st_folium's last returned state"""
+    zoom = map_state.get("zoom") or MAP_DEFAULT_ZOOM
+    bounds = map_state.get("bounds") or {}
+    south_west, north_east = bounds.get("_southWest") or {}, bounds.get("_northEast") or {}
+    if None not in (south_west.get("lat"), south_west.get("lng"), north_east.get("lat"), north_east.get("lng")):
+        return (south_west["lat"], south_west["lng"], north_east["lat"], north_east["lng"]), zoom
+
+    # First render: approximate the default view from the map size (256 px web-mercator tiles)
+    lon_span = 360 / 2 ** zoom * MAP_WIDTH_PX / 256
+    lat_span = lon_span * MAP_HEIGHT_PX / MAP_WIDTH_PX * np.cos(np.radians(MAP_DEFAULT_CENTER[0]))
+    lat, lon = MAP_DEFAULT_CENTER
+    return (lat - lat_span / 2, lon - lon_span / 2, lat + lat_span / 2, lon + lon_span / 2), zoom
+
+def tile_size_for_zoom(zoom):
+    """Tile edge in degrees: one web-mercator tile at this zoom, so a viewport spans a handful of tiles"""
+    return max(360 / 2 ** int(zoom), 0.005)
+
+def viewport_tiles(bounds, tile_deg, margin=VIEWPORT_MARGIN):
+    """Grid tiles covering the viewport expanded by `margin` on every side"""
+    south, west, north, east = bounds
+    lat_pad, lon_pad = (north - south) * margin, (east - west) * margin
+    rows = range(int(np.floor((south - lat_pad) / tile_deg)), int(np.floor((north + lat_pad) / tile_deg)) + 1)
+    cols = range(int(np.floor((west - lon_pad) / tile_deg)), int(np.floor((east + lon_pad) / tile_deg)) + 1)
+    return [(i, j) for i in rows for j in cols]
+
+def build_popup_text(row):
+    """Popup text for one survey: location plus every recorded disease and severity"""
+    popup_text = f"{row.get('survey_location', 'Unknown')}"
+    for slot in (1, 2, 3):
+        disease_name = row.get(f"disease{slot}")
+        if pd.isna(disease_name) or disease_name == "":
+            continue
+        severity = row.get(f"severity{slot}_percent")
+        if not pd.isna(severity):
+            popup_text += f" | Disease{slot}: {disease_name} ({severity}%)"
+        else:
+            popup_text += f" | Disease{slot}: {disease_name}"
+    return popup_text
+
+@st.cache_resource
+def get_marker_tile_cache():
+    """Process-wide cache of marker lists per (filter, tile); oldest tiles are evicted first"""
+    return {"lock": threading.Lock(), "tiles": OrderedDict()}
+
+def get_viewport_markers(view, tile_deg, tiles, color_map):
+    """Markers for `tiles`, computing only tiles not already cached for this filtered view and zoom"""
+    cache = get_marker_tile_cache()
+    tile_keys = {tile: (view["key"], tile_deg, tile) for tile in tiles}
+
+    with cache["lock"]:
+        missing = [tile for tile, key in tile_keys.items() if key not in cache["tiles"]]
+
+    if missing:
+        df_filtered, lats, lons = view["df"], view["lats"], view["lons"]
+        valid = np.isfinite(lats) & np.isfinite(lons)
+        tile_rows = np.floor(np.where(valid, lats, 0) / tile_deg).astype(np.int64)
+        tile_cols = np.floor(np.where(valid, lons, 0) / tile_deg).astype(np.int64)
+
+        missing_index = pd.MultiIndex.from_tuples(missing)
+        in_missing = valid & pd.MultiIndex.from_arrays([tile_rows, tile_cols]).isin(missing_index)
+
+        # Colour by the filtered disease (whichever slot it is in), otherwise by Disease 1
+        filter_disease = view["key"][2]
+        new_tiles = {tile: [] for tile in missing}
+        for pos in np.flatnonzero(in_missing):
+            row = df_filtered.iloc[pos]
+            new_tiles[(tile_rows[pos], tile_cols[pos])].append((
+                float(lats[pos]),
+                float(lons[pos]),
+                color_map.get(filter_disease if filter_disease != "All" else row.get("disease1"), "gray"),
+                build_popup_text(row),
+            ))
+
+        with cache["lock"]:
+            for tile, tile_markers in new_tiles.items():
+                cache["tiles"][tile_keys[tile]] = tile_markers
+            while len(cache["tiles"]) > MAX_CACHED_TILES:
+                cache["tiles"].popitem(last=False)
+
+    markers = []
+    with cache["lock"]:
+        for key in tile_keys.values():
+            tile_markers = cache["tiles"].get(key)
+            if tile_markers is None:
+                continue
+            cache["tiles"].move_to_end(key)
+            markers.extend(tile_markers)
+    return markers, len(missing)
+
+# -------------------------------
+# Seasonal reports (rendered on a process pool so the server stays responsive)
+REPORT_WORKERS = 2
+
+@st.cache_resource
+def get_report_pool():
+    """Process pool and job table shared by all sessions"""
+    return {
+        # spawn: workers import only reports.py, never this script
+        "executor": ProcessPoolExecutor(max_workers=REPORT_WORKERS, mp_context=multiprocessing.get_context("spawn")),
+        "jobs": {},
+        "lock": threading.Lock(),
+    }
+
+def submit_report_jobs(jobs):
+    """Queue every report not already on disk or in flight; returns (queued, skipped)"""
+    pool = get_report_pool()
+    queued = skipped = 0
+    with pool["lock"]:
+        for job in jobs:
+            existing = pool["jobs"].get(job["path"])
+            if os.path.exists(job["path"]) or (existing and not existing["future"].done()):
+                skipped += 1
+                continue
+            pool["jobs"][job["path"]] = {
+                "season": job["season"],
+                "region": job["region"],
+                "crop": job["crop"],
+                "submitted_at": datetime.now(),
+                "future": pool["executor"].submit(render_report, job),
+            }
+            queued += 1
+    return queued, skipped
+
+def report_status(future):
+    """Human readable state of a report future"""
+    if future.running():
+        return "running"
+    if not future.done():
+        return "queued"
+    if future.cancelled():
+        return "cancelled"
+    if future.exception() is not None:
+        return f"failed: {future.exception()}"
+    return "done"
+
+@st.fragment(run_every=3)
+def render_report_status(version):
+    """Job table for the seasonal reports, polled every few seconds"""
+    pool = get_report_pool()
+    with pool["lock"]:
+        entries = list(pool["jobs"].items())
+
+    rows = [
+        {
+            "season": entry["season"],
+            "region": entry["region"],
+            "crop": entry["crop"],
+            "status": report_status(entry["future"]),
+            "submitted": entry["submitted_at"].strftime("%H:%M:%S"),
+        }
+        for path, entry in entries
+        if path.startswith(os.path.join(REPORTS_DIR, version))
+    ]
+    if rows:
+        st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+
+    version_dir = os.path.join(REPORTS_DIR, version)
+    finished = sorted(name for name in os.listdir(version_dir) if name.endswith(".html")) if os.path.isdir(version_dir) else []
+    if finished:
+        report_name = st.selectbox("Finished reports", finished)
+        with open(os.path.join(version_dir, report_name), "rb") as f:
+            st.download_button("⬇️ Download Report", f.read(), report_name, "text/html")
+    elif not rows:
+        st.write("No reports generated for the current data yet.")
+
 # Debug code to check authentication
 if st.sidebar.button("Debug Google Sheets Connection"):
     client = get_gs_client()
     if client:
         try:
-            spreadsheet = client.open_by_key("15D6_hA_LhG6M8CKMUFikCxXPQNtxhNBSCykaBF2egtE")
+            spreadsheet = client.open_by_key(SHEET_ID)
             st.sidebar.success("✅ Successfully connected to Google Sheets")
-            worksheet = spreadsheet.sheet1
-            records = worksheet.get_all_records()
-            st.sidebar.write(f"Found {len(records)} records in sheet")
+            sheets = read_cloud_sheets(spreadsheet)
+            counts = [max(len(values) - 1, 0) for _, values in sheets]
+            st.sidebar.write(f"Found {sum(counts)} records in {len(sheets)} worksheet(s)")
+            for (worksheet, _), count in zip(sheets, counts):
+                st.sidebar.caption(f"{worksheet.title}: {count}")
         except Exception as e:
             st.sidebar.error(f"Error accessing sheet: {e}")
     else:
@@ -383,111 +998,150 @@ if st.sidebar.button("🔄 Refresh Data"):
 
 # Make sure df exists in session state
 if "df" not in st.session_state:
-    st.session_state.df = pd.DataFrame()
+    set_session_data(pd.DataFrame())
 df = st.session_state.df
+data_ver = st.session_state.data_ver
+layout_ver = st.session_state.layout_ver
+st.session_state["script_run_seq"] = st.session_state.get("script_run_seq", 0) + 1
 
 # -------------------------------
 # Disease Tracker Page - FIXED VERSION
-if menu == "Disease tracker":
-    st.markdown("## 🗺 Disease Tracker")
-
-    # Check if we have data
-    if df.empty:
-        st.warning("No data available. Please check your data sources.")
-        st.stop()
-    
-    # Ensure we have the required columns
-    required_columns = ["sample_id", "date", "crop", "disease1", "severity1_percent", "latitude", "longitude", "survey_location"]
-    missing_columns = [col for col in required_columns if col not in df.columns]
-    
-    if missing_columns:
-        st.error(f"Missing required columns in data: {missing_columns}")
-        st.stop()
-
-    col1, col2, col3 = st.columns([1.5, 1, 1])
-    with col1:
-        crop = st.selectbox("Choose a Crop", ["All"] + sorted(df["crop"].dropna().unique()))
-    with col2:
-        disease = st.selectbox("Choose a Disease", ["All"] + sorted(df["disease1"].dropna().unique()))
-    with col3:
-        min_date = df["date"].min().date() if not df["date"].isna().all() else datetime(2020, 1, 1).date()
-        max_date = df["date"].max().date() if not df["date"].isna().all() else datetime.today().date()
-        date_range = st.date_input("Select Date Range", [min_date, max_date])
-
-    # Filter data
-    mask = (df["date"] >= pd.to_datetime(date_range[0])) & (df["date"] <= pd.to_datetime(date_range[1]))
-    if crop != "All":
-        mask &= df["crop"] == crop
-    if disease != "All":
-        mask &= df["disease1"] == disease
+# -------------------------------
+# Disease tracker sections
+# Each section is a fragment with explicit inputs: interacting with a widget inside it
+# (panning the map, changing the graph axis, editing the table) reruns only that section.
+@contextmanager
+def timed_section(name):
+    """Record a section's run time, split into full-page reruns and isolated fragment reruns"""
+    timings = st.session_state.setdefault("section_timings", {})
+    entry = timings.setdefault(name, {"full_ms": None, "fragment_ms": None, "run_seq": None})
+    run_seq = st.session_state.get("script_run_seq", 0)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        # A second run within the same script run can only be a fragment rerun
+        if entry["run_seq"] == run_seq:
+            entry["fragment_ms"] = elapsed_ms
+        else:
+            entry["full_ms"] = elapsed_ms
+            entry["run_seq"] = run_seq
+
+@st.cache_data(max_entries=4)
+def build_editable_frame(layout, show_all_columns, _df):
+    """Copy of the survey data prepared for st.data_editor (cached per layout_version(), since edits are merged back by row)"""
+    if show_all_columns:
+        editable_df = _df.copy()
+    else:
+        # Select only the columns that exist in the dataframe
+        available_columns = ["sample_id", "date", "crop", "disease1", "survey_location", "severity1_percent"]
+        existing_columns = [col for col in available_columns if col in _df.columns]
+        editable_df = _df[existing_columns].copy()
+
+    # Categorical columns would restrict the editor to existing values, so edit them as text
+    categorical_columns = [col for col in editable_df.columns if isinstance(editable_df[col].dtype, pd.CategoricalDtype)]
+    editable_df = editable_df.astype({col: "string" for col in categorical_columns})
+
+    # Ensure date column is in proper format for editing
+    if 'date' in editable_df.columns:
+        editable_df['date'] = parse_survey_dates(editable_df['date']).dt.strftime('%d/%m/%Y')
+    return editable_df
+
+@st.cache_data(max_entries=4)
+def encode_survey_csv(layout, _df):
+    """CSV download bytes with dd/mm/YYYY dates and 6-decimal coordinates (cached per layout_version())"""
+    return serialize_survey_frame(_df).to_csv(index=False).encode("utf-8")
+
+@st.cache_data(max_entries=8)
+def build_photo_zip(photo_filenames):
+    """ZIP archive of the given uploaded photos (cached per set of filenames)"""
+    zip_buffer = io.BytesIO()
+    with zipfile.ZipFile(zip_buffer, "w") as zf:
+        for photo_filename in photo_filenames:
+            photo_path = os.path.join("uploads", photo_filename)
+            if os.path.exists(photo_path):
+                zf.write(photo_path, arcname=photo_filename)
+    return zip_buffer.getvalue()
+
+@st.fragment
+def render_map_section(df, view, crop, disease, date_range, version, disease_color_map):
+    """Map with viewport-culled markers and the optional heatmap"""
+    with timed_section("Map"):
+        st.markdown("### Map View")
 
-    df_filtered = df.loc[mask]
+        # Base map stays identical across reruns so panning does not remount it
+        m = folium.Map(location=list(MAP_DEFAULT_CENTER), zoom_start=MAP_DEFAULT_ZOOM)
+
+        # Only markers in the last reported viewport (plus a margin) are sent to the browser
+        map_state = st.session_state.get("tracker_map") or {}
+        bounds, zoom = viewport_from_map_state(map_state)
+        tile_deg = tile_size_for_zoom(zoom)
+        tiles = viewport_tiles(bounds, tile_deg)
+        markers, n_new_tiles = get_viewport_markers(view, tile_deg, tiles, disease_color_map)
+
+        marker_layer = folium.FeatureGroup(name="Surveys")
+        for lat, lon, color, popup_text in markers:
+            folium.CircleMarker(
+                location=[lat, lon],
+                radius=6,
+                color=color,
+                fill=True,
+                fill_color=color,
+                popup=popup_text,
+            ).add_to(marker_layer)
+        st.caption(
+            f"Showing {len(markers)} of {len(view['df'])} filtered reports in view "
+            f"({len(tiles)} tiles, {n_new_tiles} newly loaded)."
+        )
 
-    # Metrics
-    st.markdown("### Key Metrics")
-    if not df_filtered.empty:
-        col1, col2, col3 = st.columns(3)
-        col1.metric("Total Surveys", len(df))
-        col2.metric("Max Severity (%)", int(df_filtered["severity1_percent"].max()))
-        col3.metric("Average Severity (%)", round(df_filtered["severity1_percent"].mean(), 1))
-    else:
-        st.warning("No data found for the selected filters.")
+        # Severity heatmap / hotspot overlay
+        col1, col2 = st.columns(2)
+        with col1:
+            show_heatmap = st.checkbox("Show severity heatmap", value=False)
+        with col2:
+            hotspot_threshold = st.slider(
+                "Hotspot threshold (% of peak intensity)", min_value=10, max_value=100, value=70, step=5,
+                disabled=not show_heatmap,
+            )
 
-    # Create tabs for Map and Graph
-    tab1, tab2 = st.tabs(["🗺️ Map", "📊 Graph"])
-    with tab1:
-        st.markdown("### Map View")
-    
-        unique_diseases = df["disease1"].dropna().unique()
-        disease_colors = px.colors.qualitative.Set3[:len(unique_diseases)]
-        disease_color_map = dict(zip(unique_diseases, disease_colors))
-    
-        # Create the map only once
-        m = folium.Map(location=[-34.96, 138.63], zoom_start=6)
-    
-        # Add markers
-        for _, row in df_filtered.iterrows():
-            if not pd.isna(row["latitude"]) and not pd.isna(row["longitude"]):
-                popup_text = f"{row.get('survey_location', 'Unknown')}"
-    
-                if not pd.isna(row.get("disease1")):
-                    if not pd.isna(row.get("severity1_percent")):
-                        popup_text += f" | Disease1: {row['disease1']} ({row['severity1_percent']}%)"
-                    else:
-                        popup_text += f" | Disease1: {row['disease1']}"
-    
-                if not pd.isna(row.get("disease2")) and row["disease2"] != "":
-                    if not pd.isna(row.get("severity2_percent")):
-                        popup_text += f" | Disease2: {row['disease2']} ({row['severity2_percent']}%)"
-                    else:
-                        popup_text += f" | Disease2: {row['disease2']}"
-                        
-                if not pd.isna(row.get("disease3")) and row["disease3"] != "":
-                    if not pd.isna(row.get("severity3_percent")):
-                        popup_text += f" | Disease3: {row['disease3']} ({row['severity3_percent']}%)"
-                    else:
-                        popup_text += f" | Disease3: {row['disease3']}"
-    
-                color = disease_color_map.get(row["disease1"], "gray")
-                folium.CircleMarker(
-                    location=[row["latitude"], row["longitude"]],
-                    radius=6,
-                    color=color,
-                    fill=True,
-                    fill_color=color,
-                    popup=popup_text,
-                ).add_to(m)
-    
-        # Render the map
-        st_folium(m, width=800, height=450)
-       
+        if show_heatmap:
+            heatmap = compute_severity_heatmap(version, crop, disease, date_range[0], date_range[-1], view["entries"])
+            if heatmap is not None:
+                HeatMap(heatmap_points(heatmap), name="Severity heatmap", radius=18, blur=15, min_opacity=0.3).add_to(m)
+                hotspots = heatmap_hotspots(heatmap, hotspot_threshold / 100)
+                for bounds, intensity in hotspots:
+                    folium.Rectangle(
+                        bounds=bounds,
+                        color="red",
+                        weight=1,
+                        fill=True,
+                        fill_opacity=0.25,
+                        tooltip=f"Hotspot: {intensity:.0%} of peak",
+                    ).add_to(m)
+                st.caption(f"Heatmap of {heatmap['n_reports']} reports with severity > 0; {len(hotspots)} hotspot cells.")
+            else:
+                st.info("No located reports with severity above 0 for the heatmap.")
+
+        # Render the map; bounds/zoom come back through session state on the next rerun
+        st_folium(
+            m,
+            width=800,
+            height=450,
+            key="tracker_map",
+            feature_group_to_add=marker_layer,
+            returned_objects=["bounds", "zoom"],
+        )
 
-    with tab2:
+@st.fragment
+def render_graph_section(entries, disease_color_map):
+    """Mean severity bar chart over every recorded disease (all slots)"""
+    with timed_section("Graph"):
         st.markdown("### Disease Severity Graph")
 
         x_axis = st.selectbox("X-Axis", ["Crop", "Location"])
 
-        if not df_filtered.empty:
+        if not entries.empty:
             if x_axis == "Crop":
                 x_col = "crop"
                 title = "Mean Disease Severity by Crop"
@@ -495,23 +1149,23 @@ if menu == "Disease tracker":
                 x_col = "survey_location"
                 title = "Mean Disease Severity by Location"
             else:
-                x_col = "disease1"
+                x_col = "disease"
                 title = "Mean Disease Severity by Disease Type"
 
             # Aggregate mean severity
             df_mean = (
-                df_filtered
-                .groupby([x_col, "disease1"], as_index=False)
-                .agg(mean_severity=("severity1_percent", "mean"))
+                entries
+                .groupby([x_col, "disease"], as_index=False, observed=True)
+                .agg(mean_severity=("severity", "mean"))
             )
 
             fig = px.bar(
                 df_mean,
                 x=x_col,
                 y="mean_severity",
-                color="disease1",
+                color="disease",
                 title=title,
-                labels={"mean_severity": "Mean Severity (%)", x_col: x_axis},
+                labels={"mean_severity": "Mean Severity (%)", x_col: x_axis, "disease": "Disease"},
                 color_discrete_map=disease_color_map,
                 barmode="group",
             )
@@ -520,203 +1174,300 @@ if menu == "Disease tracker":
         else:
             st.info("No data available for the graph.")
 
+@st.fragment
+def render_trends_section(df, crop, disease, date_range, version, disease_color_map):
+    """Weekly/monthly severity and incidence trends"""
+    with timed_section("Trends"):
+        st.markdown("### Severity Trends")
 
-    st.markdown("### Surveillance Summary")
-        
-    if not df.empty:
-        # Option to show all columns or just selected ones
-        show_all_columns = st.checkbox("Show all columns", value=False)
-        
-        # Create a working copy of the dataframe for editing
-        if show_all_columns:
-            editable_df = df.copy()
+        col1, col2 = st.columns(2)
+        with col1:
+            granularity = st.radio("Time window", list(TREND_FREQUENCIES), horizontal=True)
+        with col2:
+            rolling_window = st.number_input("Rolling mean window (periods)", min_value=1, max_value=12, value=4, step=1)
+
+        trend_aggs = get_trend_aggregates(df, version)
+        trend_view = pd.DataFrame()
+        if trend_aggs is not None:
+            trend_view = build_trend_view(
+                trend_aggs,
+                TREND_FREQUENCIES[granularity],
+                crop,
+                disease,
+                pd.to_datetime(date_range[0]),
+                pd.to_datetime(date_range[-1]),
+                int(rolling_window),
+            )
+
+        if not trend_view.empty:
+            fig = px.line(
+                trend_view,
+                x="period",
+                y="rolling_mean_severity",
+                color="disease",
+                markers=True,
+                title=f"{granularity} Mean Severity ({int(rolling_window)}-period rolling mean)",
+                labels={"period": "Period", "rolling_mean_severity": "Mean Severity (%)", "disease": "Disease"},
+                color_discrete_map=disease_color_map,
+                hover_data={"mean_severity": ":.1f", "n_reports": True},
+            )
+            st.plotly_chart(fig, use_container_width=True)
+
+            fig = px.bar(
+                trend_view,
+                x="period",
+                y="incidence_percent",
+                color="disease",
+                title=f"{granularity} Incidence (% of surveys with the disease present)",
+                labels={"period": "Period", "incidence_percent": "Incidence (%)", "disease": "Disease"},
+                color_discrete_map=disease_color_map,
+                barmode="group",
+            )
+            st.plotly_chart(fig, use_container_width=True)
+
+            st.markdown("#### Season-over-season")
+            season_curves, season_summary = build_season_comparison(trend_view)
+            fig = px.line(
+                season_curves,
+                x="season_position",
+                y="mean_severity",
+                color="season",
+                markers=True,
+                labels={
+                    "season_position": "Week of year" if granularity == "Weekly" else "Month",
+                    "mean_severity": "Mean Severity (%)",
+                    "season": "Season",
+                },
+            )
+            st.plotly_chart(fig, use_container_width=True)
+            st.dataframe(season_summary, use_container_width=True, hide_index=True)
         else:
-            # Select only the columns that exist in the dataframe
-            available_columns = ["sample_id", "date", "crop", "disease1", "survey_location", "severity1_percent"]
-            existing_columns = [col for col in available_columns if col in df.columns]
-            editable_df = df[existing_columns].copy()
-        
-        # Ensure date column is in proper format for editing
-        if 'date' in editable_df.columns:
-            # Convert to datetime if not already
-            if not pd.api.types.is_datetime64_any_dtype(editable_df['date']):
-                editable_df['date'] = pd.to_datetime(editable_df['date'], errors='coerce')
-            # Format for display in the editor
-            editable_df['date'] = editable_df['date'].dt.strftime('%d/%m/%Y')
-    
-        # Make table editable - use a unique key for the data_editor
-        edited_df = st.data_editor(
-            editable_df,
-            num_rows="dynamic",
-            use_container_width=True,
-            key="surveillance_summary_editor",
-        )
-    
-        # Save edited changes
-        if st.button("💾 Save Changes"):
-            try:
-                # Create a complete updated dataframe with all changes
-                if show_all_columns:
-                    updated_df = edited_df.copy()
-                else:
-                    # Merge changes back into the full dataframe
-                    updated_df = df.copy()
-                    for col in edited_df.columns:
-                        if col in updated_df.columns:
-                            # Update only the columns that were edited
-                            if col == 'date':
-                                # Handle date conversion properly
-                                updated_df[col] = pd.to_datetime(edited_df[col], format='%d/%m/%Y', errors='coerce')
-                            else:
-                                updated_df[col] = edited_df[col]
-                
-                # Ensure date column is properly formatted in the final dataframe
-                if 'date' in updated_df.columns:
-                    if not pd.api.types.is_datetime64_any_dtype(updated_df['date']):
-                        updated_df['date'] = pd.to_datetime(updated_df['date'], errors='coerce')
-                
-                # Update session state
-                st.session_state.df = updated_df
-                
-                # Save to local storage
-                save_local_data(st.session_state.df)
-                
-                # Save to Google Sheets
-                try:
-                    spreadsheet = get_spreadsheet()
-                    if spreadsheet:
-                        worksheet = spreadsheet.sheet1
-                        
-                        # Clear the entire worksheet
-                        worksheet.clear()
-                        
-                        # Prepare data for Google Sheets - ensure proper date formatting
-                        gs_df = st.session_state.df.copy()
-                        if 'date' in gs_df.columns:
-                            gs_df['date'] = gs_df['date'].dt.strftime('%d/%m/%Y')
-                        
-                        # Add headers
-                        worksheet.append_row(gs_df.columns.tolist())
-                        
-                        # Add all data rows
-                        if not gs_df.empty:
-                            # Convert all values to strings and handle NaN/None
-                            data_rows = []
-                            for _, row in gs_df.iterrows():
-                                row_values = []
-                                for val in row:
-                                    if pd.isna(val):
-                                        row_values.append("")
-                                    else:
-                                        row_values.append(str(val))
-                                data_rows.append(row_values)
-                            
-                            worksheet.append_rows(data_rows, value_input_option="USER_ENTERED")
-                        
-                        st.success("✅ Changes saved to Google Sheets and local storage!")
-                        
-                        # Force reload from cloud to ensure consistency
-                        reload_data()
-                        
-                    else:
-                        st.warning("⚠️ Could not connect to Google Sheets, saved only locally.")
-                except Exception as e:
-                    st.error(f"❌ Error saving to Google Sheets: {e}")
-                    st.info("Data saved to local storage only.")
-                    
-            except Exception as e:
-                st.error(f"Error processing changes: {e}")
-
-        # Row deletion section
-        st.markdown("### Delete Records")
-        rows_to_delete = st.multiselect(
-            "Select rows to delete (by Sample ID)",
-            options=edited_df["sample_id"].tolist(),
-        )
-        
-        if st.button("🗑 Delete Selected Rows"):
-            if rows_to_delete:
-                # Remove from session state
-                st.session_state.df = st.session_state.df[~st.session_state.df["sample_id"].isin(rows_to_delete)]
-                
-                # Save to local
-                save_local_data(st.session_state.df)
-                
-                # Save to Google Sheets
+            st.info("No data available for trends.")
+
+@st.fragment
+def render_summary_section(df, layout):
+    """Editable survey table with save, delete and CSV download"""
+    with timed_section("Summary table"):
+        st.markdown("### Surveillance Summary")
+
+        if not df.empty:
+            # Option to show all columns or just selected ones
+            show_all_columns = st.checkbox("Show all columns", value=False)
+
+            # Working copy for the editor (cached per row layout and column choice)
+            editable_df = build_editable_frame(layout, show_all_columns, df)
+
+            # Make table editable - use a unique key for the data_editor
+            edited_df = st.data_editor(
+                editable_df,
+                num_rows="dynamic",
+                use_container_width=True,
+                key="surveillance_summary_editor",
+            )
+
+            # Save edited changes
+            if st.button("💾 Save Changes"):
                 try:
-                    spreadsheet = get_spreadsheet()
-                    if spreadsheet:
-                        worksheet = spreadsheet.sheet1
-                        worksheet.clear()
-                        
-                        # Prepare data for Google Sheets - ensure proper date formatting
-                        gs_df = st.session_state.df.copy()
-                        if 'date' in gs_df.columns:
-                            gs_df['date'] = gs_df['date'].dt.strftime('%d/%m/%Y')
-                        
-                        worksheet.append_row(gs_df.columns.tolist())
-                        
-                        if not gs_df.empty:
-                            data_rows = []
-                            for _, row in gs_df.iterrows():
-                                row_values = []
-                                for val in row:
-                                    if pd.isna(val):
-                                        row_values.append("")
-                                    else:
-                                        row_values.append(str(val))
-                                data_rows.append(row_values)
-                            
-                            worksheet.append_rows(data_rows, value_input_option="USER_ENTERED")
-                        
-                        st.success(f"✅ Deleted {len(rows_to_delete)} record(s) from both local and cloud storage!")
-                        
-                        # Force reload
-                        reload_data()
+                    # Create a complete updated dataframe with all changes
+                    if show_all_columns:
+                        updated_df = edited_df.copy()
                     else:
-                        st.warning("⚠️ Could not connect to Google Sheets, deleted from local storage only.")
+                        # Merge changes back into the full dataframe
+                        updated_df = df.copy()
+                        for col in edited_df.columns:
+                            if col in updated_df.columns:
+                                # Update only the columns that were edited
+                                if col == 'date':
+                                    # Handle date conversion properly
+                                    updated_df[col] = pd.to_datetime(edited_df[col], format='%d/%m/%Y', errors='coerce')
+                                else:
+                                    updated_df[col] = edited_df[col]
+
+                    # Ensure date column is properly formatted in the final dataframe
+                    if 'date' in updated_df.columns:
+                        updated_df['date'] = parse_survey_dates(updated_df['date'])
+
+                    # Restore the compact dtypes that the editor round-trip loses
+                    updated_df = apply_survey_schema(updated_df)
+
+                    # Update session state
+                    set_session_data(updated_df)
+
+                    # Save to local storage
+                    save_local_data(st.session_state.df)
+
+                    # Save to Google Sheets: write only the records that changed, by sample ID
+                    try:
+                        spreadsheet = get_spreadsheet()
+                        if spreadsheet:
+                            edits = reconcile_surveys(st.session_state.df, df)
+                            appended, updated, deleted = write_rows_by_key(
+                                spreadsheet,
+                                pd.concat([edits["changed_local"], edits["local_only"]]),
+                                edits["cloud_only"].index,
+                            )
+
+                            st.success(
+                                f"✅ Changes saved to Google Sheets ({updated} updated, {appended} added, "
+                                f"{deleted} removed) and local storage!"
+                            )
+
+                            # Force reload from cloud to ensure consistency
+                            reload_data()
+
+                        else:
+                            st.warning("⚠️ Could not connect to Google Sheets, saved only locally.")
+                    except Exception as e:
+                        st.error(f"❌ Error saving to Google Sheets: {e}")
+                        st.info("Data saved to local storage only.")
+
                 except Exception as e:
-                    st.error(f"Error deleting from Google Sheets: {e}")
-            else:
-                st.warning("Please select at least one record to delete.")
-    
-        # Download option - ensure proper date formatting in download
-        download_df = st.session_state.df.copy()
-        if 'date' in download_df.columns and pd.api.types.is_datetime64_any_dtype(download_df['date']):
-            download_df['date'] = download_df['date'].dt.strftime('%d/%m/%Y')
-            
-        st.download_button(
-            "⬇️ Download CSV",
-            download_df.to_csv(index=False).encode("utf-8"),
-            "survey.csv",
-            "text/csv",
-        )
-    else:
-        st.info("No data available for the selected filters.")
+                    st.error(f"Error processing changes: {e}")
 
+            # Row deletion section
+            st.markdown("### Delete Records")
+            rows_to_delete = st.multiselect(
+                "Select rows to delete (by Sample ID)",
+                options=edited_df["sample_id"].tolist(),
+            )
 
+            if st.button("🗑 Delete Selected Rows"):
+                if rows_to_delete:
+                    # Remove from session state
+                    set_session_data(st.session_state.df[~st.session_state.df["sample_id"].isin(rows_to_delete)])
+
+                    # Save to local
+                    save_local_data(st.session_state.df)
+
+                    # Save to Google Sheets: delete just those rows, wherever they are
+                    try:
+                        spreadsheet = get_spreadsheet()
+                        if spreadsheet:
+                            write_rows_by_key(spreadsheet, rows_to_frame([]), rows_to_delete)
+
+                            st.success(f"✅ Deleted {len(rows_to_delete)} record(s) from both local and cloud storage!")
+
+                            # Force reload
+                            reload_data()
+                        else:
+                            st.warning("⚠️ Could not connect to Google Sheets, deleted from local storage only.")
+                    except Exception as e:
+                        st.error(f"Error deleting from Google Sheets: {e}")
+                else:
+                    st.warning("Please select at least one record to delete.")
+
+            # Download option - dates formatted as dd/mm/YYYY, encoded once per data version
+            st.download_button(
+                "⬇️ Download CSV",
+                encode_survey_csv(layout, df),
+                "survey.csv",
+                "text/csv",
+            )
+        else:
+            st.info("No data available for the selected filters.")
+
+@st.fragment
+def render_photos_section(df_filtered):
+    """ZIP download of the photos for the filtered surveys"""
+    with timed_section("Photos"):
+        st.markdown("### 📸 Download Photos")
+
+        # Filter only rows with photos
+        df_photos = df_filtered[df_filtered["photo_filename"].notna() & (df_filtered["photo_filename"] != "")]
+
+        if not df_photos.empty:
+            # Download all photos as ZIP (cached per set of photos)
+            st.download_button(
+                "Download All Photos (ZIP)",
+                data=build_photo_zip(tuple(sorted(df_photos["photo_filename"].astype(str).unique()))),
+                file_name="disease_photos.zip",
+                mime="application/zip",
+            )
+        else:
+            st.info("No photos available for the selected filters.")
+
+if menu == "Disease tracker":
+    st.markdown("## 🗺 Disease Tracker")
+
+    # Check if we have data
+    if df.empty:
+        st.warning("No data available. Please check your data sources.")
+        st.stop()
     
-    st.markdown("### 📸 Download Photos")
-    
-    # Filter only rows with photos
-    df_photos = df_filtered[df_filtered["photo_filename"].notna() & (df_filtered["photo_filename"] != "")]
+    # Ensure we have the required columns
+    required_columns = ["sample_id", "date", "crop", "disease1", "severity1_percent", "latitude", "longitude", "survey_location"]
+    missing_columns = [col for col in required_columns if col not in df.columns]
     
-    if not df_photos.empty:
-        # Download all photos as ZIP
-        zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, "w") as zf:
-            for _, row in df_photos.iterrows():
-                photo_path = os.path.join("uploads", row["photo_filename"])
-                if os.path.exists(photo_path):
-                    zf.write(photo_path, arcname=row["photo_filename"])
-        st.download_button(
-            "Download All Photos (ZIP)",
-            data=zip_buffer.getvalue(),
-            file_name="disease_photos.zip",
-            mime="application/zip",
-        )
+    if missing_columns:
+        st.error(f"Missing required columns in data: {missing_columns}")
+        st.stop()
+
+    col1, col2, col3 = st.columns([1.5, 1, 1])
+    with col1:
+        crop = st.selectbox("Choose a Crop", ["All"] + sorted(df["crop"].dropna().unique()))
+    with col2:
+        disease_index = get_disease_index(layout_ver, df)
+        disease = st.selectbox("Choose a Disease", ["All"] + disease_index.diseases)
+    with col3:
+        min_date = df["date"].min().date() if not df["date"].isna().all() else datetime(2020, 1, 1).date()
+        max_date = df["date"].max().date() if not df["date"].isna().all() else datetime.today().date()
+        date_range = st.date_input("Select Date Range", [min_date, max_date])
+
+    # Filter data (shared across sessions per filter and data version)
+    view = get_filtered_view(df, data_ver, layout_ver, crop, disease, date_range[0], date_range[-1])
+    df_filtered = view["df"]
+
+    # Metrics
+    st.markdown("### Key Metrics")
+    if not df_filtered.empty:
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Total Surveys", len(df))
+        col2.metric("Max Severity (%)", view["max_severity"])
+        col3.metric("Average Severity (%)", view["mean_severity"])
     else:
-        st.info("No photos available for the selected filters.")
+        st.warning("No data found for the selected filters.")
+
+    # Colours cover every disease in any slot (Set3 repeats beyond 12 diseases)
+    disease_palette = px.colors.qualitative.Set3
+    disease_color_map = {name: disease_palette[i % len(disease_palette)] for i, name in enumerate(disease_index.diseases)}
+
+    # Create tabs for Map and Graph
+    tab1, tab2, tab3 = st.tabs(["🗺️ Map", "📊 Graph", "📈 Trends"])
+    with tab1:
+        render_map_section(df, view, crop, disease, date_range, data_ver, disease_color_map)
+    with tab2:
+        render_graph_section(view["entries"], disease_color_map)
+    with tab3:
+        render_trends_section(df, crop, disease, date_range, data_ver, disease_color_map)
+
+    render_summary_section(df, layout_ver)
+    render_photos_section(df_filtered)
+
+    # Compare a full page rerun with the isolated section reruns recorded by timed_section()
+    st.session_state["tracker_full_ms"] = (time.perf_counter() - script_started) * 1000
+    with st.expander("⏱ Rerun timings"):
+        st.caption(
+            "Full rerun: the whole page after a filter change. Section rerun: only that section, "
+            "after interacting with a widget inside it."
+        )
+        timings = st.session_state.get("section_timings", {})
+        st.dataframe(
+            pd.DataFrame(
+                [
+                    {"section": name, "full rerun (ms)": entry["full_ms"], "section rerun (ms)": entry["fragment_ms"]}
+                    for name, entry in timings.items()
+                ]
+            ).round(1),
+            use_container_width=True,
+            hide_index=True,
+        )
+        st.metric("Last full page rerun (ms)", f"{st.session_state['tracker_full_ms']:.1f}")
+        view_stats = filtered_view_stats()
+        st.caption(
+            f"Shared filtered views: {view_stats['entries']} cached ({view_stats['mb']:.1f} MB), "
+            f"{view_stats['hits']} hits / {view_stats['misses']} misses ({view_stats['hit_rate']:.0%}), "
+            f"{view_stats['evictions']} evicted, {view_stats['carried']} kept across submissions."
+        )
 
 # -------------------------------
 # Tag a Disease Page 
@@ -762,6 +1513,32 @@ elif menu == "Tag a disease":
     if current_lat is None:
         current_lat, current_lon = 0.0, 0.0
 
+    # --- Nearby reports around the current GPS fix ---
+    st.sidebar.markdown("### 📍 Nearby Reports")
+    if current_lat == 0.0 and current_lon == 0.0:
+        st.sidebar.info("Nearby reports appear once a GPS fix is available.")
+    elif df.empty:
+        st.sidebar.info("No survey data loaded.")
+    else:
+        nearby_radius = st.sidebar.slider("Radius (km)", min_value=1, max_value=100, value=20)
+        nearby_days = st.sidebar.number_input("Only the last N days (0 = all)", min_value=0, max_value=3650, value=0, step=7)
+        since = pd.Timestamp.today().normalize() - pd.Timedelta(days=int(nearby_days)) if nearby_days else None
+
+        spatial_index = get_spatial_index(layout_ver, df)
+        query_start = time.perf_counter()
+        positions, distances = spatial_index.query(current_lat, current_lon, nearby_radius, since=since)
+        query_ms = (time.perf_counter() - query_start) * 1000
+
+        st.sidebar.metric("Reports nearby", len(positions))
+        st.sidebar.caption(f"Searched {len(spatial_index)} located reports in {query_ms:.2f} ms")
+        if len(positions):
+            nearby_columns = [col for col in ["sample_id", "date", "crop", "disease1", "severity1_percent"] if col in df.columns]
+            nearby_df = df.iloc[positions][nearby_columns].copy()
+            nearby_df.insert(0, "km", distances.round(1))
+            if "date" in nearby_df.columns:
+                nearby_df["date"] = nearby_df["date"].dt.strftime("%d/%m/%Y")
+            st.sidebar.dataframe(nearby_df.head(25), use_container_width=True, hide_index=True)
+
     # --- Disease tagging form ---
     with st.form("disease_form", clear_on_submit=True):
         col1, col2 = st.columns(2)
@@ -866,6 +1643,7 @@ elif menu == "Tag a disease":
 
                 if save_data(new_record):
                     st.success("✅ Submission successful! Data saved.")
+                    invalidate_filtered_views(new_record, data_ver)
                     reload_data()
                     if uploaded_file is not None:
                         st.image(uploaded_file, caption="Disease Photo", use_column_width=True)
@@ -909,24 +1687,132 @@ elif menu == "Data Management":
             
             # Add a button to open the Google Sheet
             if st.button("Open Google Sheet"):
-                st.markdown("[Open Google Sheet in Browser](https://docs.google.com/spreadsheets/d/15D6_hA_LhG6M8CKMUFikCxXPQNtxhNBSCykaBF2egtE)")
+                st.markdown(f"[Open Google Sheet in Browser](https://docs.google.com/spreadsheets/d/{SHEET_ID})")
         else:
             st.write("No cloud data found or not configured.")
+
+    st.markdown("### In-memory Dataset")
+    if not df.empty:
+        memory_after = int(df.memory_usage(deep=True).sum())
+        memory_before = df.attrs.get("memory_usage", {}).get("before", memory_after)
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Before typed schema (KB)", f"{memory_before / 1024:,.1f}")
+        col2.metric("Current (KB)", f"{memory_after / 1024:,.1f}")
+        if memory_before:
+            col3.metric("Saved", f"{(1 - memory_after / memory_before) * 100:.0f}%")
+        with st.expander("Column dtypes"):
+            st.dataframe(
+                pd.DataFrame({
+                    "dtype": df.dtypes.astype(str),
+                    "memory (KB)": (df.memory_usage(deep=True, index=False) / 1024).round(1),
+                }),
+                use_container_width=True,
+            )
+    else:
+        st.write("No data loaded.")
+
+    st.markdown("### Startup Snapshot")
+    manifest = read_snapshot_manifest()
+    if manifest:
+        st.write(f"Latest snapshot: `{manifest['version']}` ({manifest['rows']} records, written {manifest['written_at']})")
+    else:
+        st.write("No snapshot written yet.")
+    reconcile_state = get_reconcile_state()
+    if reconcile_state["status"] == "running":
+        st.info("Background reconciliation with Google Sheets is running.")
+    elif reconcile_state["status"] == "failed":
+        st.warning(
+            f"Last background reconciliation failed at "
+            f"{datetime.fromtimestamp(reconcile_state['finished_at']):%H:%M:%S}: {reconcile_state['error']}"
+        )
+    elif reconcile_state["status"] == "finished":
+        st.write(
+            f"Last background reconciliation finished at "
+            f"{datetime.fromtimestamp(reconcile_state['finished_at']):%H:%M:%S} "
+            f"(snapshot `{reconcile_state['version']}`)."
+        )
     
     st.markdown("### Synchronize Data")
+    st.caption("Compares per-row checksums of the local file and the Google Sheet; only rows that differ are transferred.")
     if st.button("Synchronize Local with Cloud"):
         try:
-            gs_data = load_from_google_sheets()
-            if not gs_data.empty:
-                # Save cloud data to local
-                save_local_data(gs_data)
-                st.success("Local data updated from cloud!")
-                reload_data()
-            else:
+            with st.spinner("Comparing local and cloud data..."):
+                sync_plan = plan_sync()
+            if sync_plan is None:
                 st.warning("No cloud data available for synchronization.")
+            st.session_state.sync_plan = sync_plan
         except Exception as e:
             st.error(f"Error during synchronization: {e}")
 
+    # Dry-run summary; nothing is written until the plan is applied
+    sync_plan = st.session_state.get("sync_plan")
+    if sync_plan:
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Identical", sync_plan["identical"])
+        col2.metric("Local only", len(sync_plan["local_only"]))
+        col3.metric("Cloud only", len(sync_plan["cloud_only"]))
+        col4.metric("Changed", len(sync_plan["changed_local"]))
+        st.caption(
+            f"{sync_plan['local_rows']} local and {sync_plan['cloud_rows']} cloud records; "
+            f"{sync_plan['blocks_differing']} of {sync_plan['blocks']} blocks of ~{SYNC_BLOCK_SIZE} rows "
+            "had different checksums and were compared row by row."
+        )
+
+        if sync_plan["local_only"].empty and sync_plan["cloud_only"].empty and sync_plan["changed_local"].empty:
+            st.success("Local and cloud data are already identical.")
+        else:
+            for label, rows in [
+                ("Local only", sync_plan["local_only"]),
+                ("Cloud only", sync_plan["cloud_only"]),
+                ("Changed (local version)", sync_plan["changed_local"]),
+                ("Changed (cloud version)", sync_plan["changed_cloud"]),
+            ]:
+                if not rows.empty:
+                    with st.expander(f"{label}: {len(rows)} record(s)"):
+                        st.dataframe(rows, use_container_width=True, hide_index=True)
+
+            direction = SYNC_DIRECTIONS[st.radio("Direction", list(SYNC_DIRECTIONS))]
+            no_rows = sync_plan["local_only"].iloc[0:0]
+            push_new = sync_plan["local_only"] if direction["push_new"] else no_rows
+            push_changed = sync_plan["changed_local"] if direction["push_changed"] else no_rows
+            pull_new = sync_plan["cloud_only"] if direction["pull_new"] else no_rows
+            pull_changed = sync_plan["changed_cloud"] if direction["pull_changed"] else no_rows
+            st.write(
+                f"Google Sheet: append {len(push_new)}, update {len(push_changed)}. "
+                f"Local file: append {len(pull_new)}, update {len(pull_changed)}."
+            )
+
+            if st.button("Apply Synchronization"):
+                try:
+                    if len(push_new) or len(push_changed):
+                        push_rows_to_cloud(sync_plan, push_new, push_changed)
+                    if len(pull_new) or len(pull_changed):
+                        pull_rows_to_local(sync_plan, pull_new, pull_changed)
+                    del st.session_state["sync_plan"]
+                    st.success("Local and cloud data synchronized!")
+                    reload_data()
+                except Exception as e:
+                    st.error(f"Error during synchronization: {e}")
+
+    st.markdown("### Seasonal Reports")
+    if not df.empty and {"date", "crop", "survey_location"}.issubset(df.columns):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            report_seasons = st.multiselect("Seasons", sorted(df["date"].dt.year.dropna().astype(int).unique(), reverse=True))
+        with col2:
+            report_crops = st.multiselect("Crops (all if empty)", sorted(df["crop"].dropna().unique()))
+        with col3:
+            report_regions = st.multiselect("Regions (all if empty)", sorted(df["survey_location"].dropna().unique()))
+
+        if st.button("Generate Reports"):
+            jobs = plan_reports(df, data_ver, seasons=report_seasons, regions=report_regions, crops=report_crops)
+            queued, skipped = submit_report_jobs(jobs)
+            st.success(f"Queued {queued} report(s); {skipped} already generated or in progress for this data version.")
+
+        render_report_status(data_ver)
+    else:
+        st.write("No survey data available for reports.")
+
 # -------------------------------
 # About Page
 elif menu == "About":
@@ -0,0 +1,334 @@
+"""Headless load test: N concurrent simulated sessions driving app.py.
+
+Each session is a Streamlit AppTest that cycles through "Disease tracker",
+"Tag a disease" (submitting a record every few rounds) and "Data Management".
+Google Sheets is replaced by an in-memory stand-in holding one worksheet per
+season, so no credentials or network are needed. Results are rerun latency percentiles per page, throughput and
+process memory for every (sessions, dataset size) combination.
+
+Usage:
+    python loadtest.py --sessions 1 4 8 --rows 1000 10000 --iterations 3
+"""
+import argparse
+import os
+import resource
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import gspread
+import numpy as np
+import pandas as pd
+
+from survey_store import SURVEY_COLUMNS, record_season, shard_title
+
+APP_FILES = ["app.py", "survey_store.py", "reports.py", "styles.css"]
+PAGES = ["Disease tracker", "Tag a disease", "Data Management"]
+
+# -------------------------------
+# Google Sheets stand-in
+class FakeWorksheet:
+    """The subset of gspread.Worksheet that app.py uses, backed by a list of rows"""
+
+    def __init__(self, title="Sheet1", sheet_id=0, cols=26):
+        self.title = title
+        self.id = sheet_id
+        self.col_count = cols
+        self.rows = []
+        self.lock = threading.Lock()
+
+    def get_all_values(self):
+        with self.lock:
+            return [list(row) for row in self.rows]
+
+    def get_all_records(self):
+        with self.lock:
+            if not self.rows:
+                return []
+            header = self.rows[0]
+            return [dict(zip(header, row)) for row in self.rows[1:]]
+
+    def append_row(self, values, value_input_option=None):
+        with self.lock:
+            self.rows.append([str(v) for v in values])
+
+    def append_rows(self, values, value_input_option=None):
+        with self.lock:
+            self.rows.extend([str(v) for v in row] for row in values)
+
+    def batch_update(self, data, value_input_option=None):
+        """A1 ranges, written from their top-left cell"""
+        with self.lock:
+            for update in data:
+                row_number, col_number = gspread.utils.a1_to_rowcol(update["range"].split(":")[0])
+                for offset, values in enumerate(update["values"]):
+                    self.rows.extend([] for _ in range(row_number + offset - len(self.rows)))
+                    row = self.rows[row_number + offset - 1]
+                    row.extend("" for _ in range(col_number - 1 + len(values) - len(row)))
+                    row[col_number - 1:col_number - 1 + len(values)] = [str(v) for v in values]
+
+    def add_cols(self, cols):
+        self.col_count += cols
+
+    def clear(self):
+        with self.lock:
+            self.rows = []
+
+class FakeSpreadsheet:
+    """Spreadsheet with the pre-sharding first worksheet plus one worksheet per season"""
+
+    def __init__(self):
+        self.sheet1 = FakeWorksheet()
+        self.tabs = [self.sheet1]
+        self.lock = threading.Lock()
+
+    def worksheets(self):
+        with self.lock:
+            return list(self.tabs)
+
+    def worksheet(self, title):
+        with self.lock:
+            for ws in self.tabs:
+                if ws.title == title:
+                    return ws
+        raise gspread.exceptions.WorksheetNotFound(title)
+
+    def add_worksheet(self, title, rows=1000, cols=26):
+        with self.lock:
+            if any(ws.title == title for ws in self.tabs):
+                raise gspread.exceptions.APIError(mock.Mock(json=lambda: {"error": {"code": 400, "message": "duplicate title"}}))
+            ws = FakeWorksheet(title, sheet_id=len(self.tabs), cols=cols)
+            self.tabs.append(ws)
+            return ws
+
+    def batch_update(self, body):
+        """Only the deleteDimension (ROWS) requests app.py sends, applied in order"""
+        for request in body["requests"]:
+            target = request["deleteDimension"]["range"]
+            ws = next(ws for ws in self.worksheets() if ws.id == target["sheetId"])
+            with ws.lock:
+                del ws.rows[target["startIndex"]:target["endIndex"]]
+
+    def load(self, rows):
+        """Reset to a header-only first sheet and `rows` split into season worksheets"""
+        header, data = rows[0], rows[1:]
+        date_col = header.index("date")
+        self.sheet1.rows = [list(header)]
+        self.tabs = [self.sheet1]
+        for row in data:
+            season = record_season(row[date_col])
+            try:
+                ws = self.worksheet(shard_title(season))
+            except gspread.exceptions.WorksheetNotFound:
+                ws = self.add_worksheet(shard_title(season))
+                ws.rows = [list(header)]
+            ws.rows.append(list(row))
+
+class FakeClient:
+    def __init__(self, spreadsheet):
+        self.spreadsheet = spreadsheet
+
+    def open_by_key(self, key):
+        return self.spreadsheet
+
+def synthetic_rows(n_rows, seed=0):
+    """Survey rows shaped like the Tag page's new_record, as sheet strings"""
+    rng = np.random.default_rng(seed)
+    diseases = ["Stripe rust", "Leaf rust", "Scald", "Blackleg", "Yellow leaf spot", "Net form net blotch"]
+    dates = pd.Timestamp("2022-05-01") + pd.to_timedelta(rng.integers(0, 1200, n_rows), unit="D")
+    df = pd.DataFrame({
+        "sample_id": [f"SARDI{25001 + i:05d}" for i in range(n_rows)],
+        "date": dates.strftime("%d/%m/%Y"),
+        "collector_name": rng.choice(["Hari Dadu", "Rohan Kimber", "Tara Garrard", "Other"], n_rows),
+        "field_type": "Commercial",
+        "Agronomist": "",
+        "crop": rng.choice(["Wheat", "Barley", "Canola", "Lentil", "Oats"], n_rows),
+        "variety": "",
+        "plant_stage": rng.choice(["Tillering", "Flowering", "Grain filling"], n_rows),
+        "disease1": rng.choice(diseases, n_rows),
+        "disease2": rng.choice(diseases + [""] * 4, n_rows),
+        "disease3": "",
+        "severity1_percent": rng.integers(0, 80, n_rows),
+        "severity2_percent": rng.integers(0, 40, n_rows),
+        "severity3_percent": 0,
+        "latitude": (-34.5 + rng.normal(0, 1.2, n_rows)).round(6),
+        "longitude": (138.6 + rng.normal(0, 1.5, n_rows)).round(6),
+        "survey_location": rng.choice(["Clare", "Minlaton", "Roseworthy", "Hart", "Turretfield"], n_rows),
+        "photo_filename": "",
+        "field_notes": "",
+        "Action": "",
+        "sample_taken": "No",
+        "sample_type": "Surveillance",
+    })
+    return [SURVEY_COLUMNS] + df[SURVEY_COLUMNS].astype(str).values.tolist()
+
+# -------------------------------
+# Sessions
+def rss_mb():
+    """Current resident set size of this process in MB"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def run_session(session_no, iterations, submit_every, timeout):
+    """Drive one simulated officer through the pages; returns [(page, seconds, error or None)]"""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file("app.py", default_timeout=timeout)
+    at.secrets["gcp_service_account"] = {"type": "service_account"}
+    timings = []
+
+    def timed(page, action):
+        start = time.perf_counter()
+        try:
+            action()
+            error = at.exception[0].value if at.exception else None
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        timings.append((page, time.perf_counter() - start, error))
+
+    timed("startup", at.run)
+    for iteration in range(iterations):
+        for page in PAGES:
+            timed(page, lambda: at.sidebar.radio[0].set_value(page).run())
+            if page == "Tag a disease" and submit_every and (iteration + session_no) % submit_every == 0:
+                def submit():
+                    location = [w for w in at.text_input if w.label == "Location (Suburb)"][0]
+                    location.set_value(f"Loadtest {session_no}")
+                    [b for b in at.button if b.label == "Submit"][0].click().run()
+                timed("submit", submit)
+    return timings
+
+def run_scenario(spreadsheet, n_sessions, n_rows, iterations, submit_every, timeout):
+    """Reset the data to `n_rows`, run `n_sessions` concurrently and summarise"""
+    import streamlit as st
+
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    shutil.rmtree("data", ignore_errors=True)
+    shutil.rmtree("reports", ignore_errors=True)
+    os.makedirs("data", exist_ok=True)
+    spreadsheet.load(synthetic_rows(n_rows))
+
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=n_sessions) as executor:
+        results = list(executor.map(
+            lambda i: run_session(i, iterations, submit_every, timeout), range(n_sessions)
+        ))
+    elapsed = time.perf_counter() - start
+
+    by_page = defaultdict(list)
+    errors = defaultdict(int)
+    for timings in results:
+        for page, seconds, error in timings:
+            by_page[page].append(seconds * 1000)
+            if error:
+                errors[f"{page}: {error}"[:200]] += 1
+    n_reruns = sum(len(v) for v in by_page.values())
+
+    rows = []
+    for page, latencies in by_page.items():
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        rows.append({
+            "sessions": n_sessions,
+            "rows": n_rows,
+            "page": page,
+            "reruns": len(latencies),
+            "p50_ms": round(p50, 1),
+            "p95_ms": round(p95, 1),
+            "p99_ms": round(p99, 1),
+            "mean_ms": round(statistics.fmean(latencies), 1),
+        })
+    summary = {
+        "sessions": n_sessions,
+        "rows": n_rows,
+        "reruns": n_reruns,
+        "failures": sum(errors.values()),
+        "seconds": round(elapsed, 2),
+        "reruns_per_s": round(n_reruns / elapsed, 2),
+        "rss_mb": round(rss_mb(), 1),
+        "rss_growth_mb": round(rss_mb() - rss_before, 1),
+    }
+    return rows, summary, errors
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for app.py")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 4, 8], help="concurrent sessions to simulate")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000], help="dataset sizes to test")
+    parser.add_argument("--iterations", type=int, default=2, help="page cycles per session")
+    parser.add_argument("--submit-every", type=int, default=2, help="submit a record every N cycles (0 = never)")
+    parser.add_argument("--timeout", type=float, default=120, help="per-rerun timeout in seconds")
+    parser.add_argument("--output", help="also write per-page latencies to this CSV")
+    args = parser.parse_args(argv)
+
+    source_dir = os.path.dirname(os.path.abspath(__file__))
+    output_path = os.path.abspath(args.output) if args.output else None
+    work_dir = tempfile.mkdtemp(prefix="surveillance_loadtest_")
+    for name in APP_FILES:
+        if os.path.exists(os.path.join(source_dir, name)):
+            shutil.copy(os.path.join(source_dir, name), work_dir)
+    os.chdir(work_dir)
+
+    # AppTest compiles the script on every run and CPython's parser is not safe to
+    # call from several threads at once; serialise only that step
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+
+    compile_lock = threading.Lock()
+    get_bytecode = ScriptCache.get_bytecode
+
+    def get_bytecode_locked(self, script_path):
+        with compile_lock:
+            return get_bytecode(self, script_path)
+
+    # AppTest installs a mock Runtime singleton for the length of each run and removes it
+    # afterwards, which races with the other sessions; keep the last one installed
+    from streamlit.runtime.runtime import Runtime
+
+    installed = {"runtime": None}
+
+    def runtime_instance(cls):
+        if cls._instance is not None:
+            installed["runtime"] = cls._instance
+        if installed["runtime"] is None:
+            raise RuntimeError("Runtime hasn't been created!")
+        return installed["runtime"]
+
+    spreadsheet = FakeSpreadsheet()
+    page_rows, summaries = [], []
+    with mock.patch("gspread.authorize", return_value=FakeClient(spreadsheet)), \
+         mock.patch("google.oauth2.service_account.Credentials.from_service_account_info", return_value=object()), \
+         mock.patch.object(ScriptCache, "get_bytecode", get_bytecode_locked), \
+         mock.patch.object(Runtime, "instance", classmethod(runtime_instance)):
+        for n_rows in args.rows:
+            for n_sessions in args.sessions:
+                rows, summary, errors = run_scenario(spreadsheet, n_sessions, n_rows, args.iterations, args.submit_every, args.timeout)
+                page_rows.extend(rows)
+                summaries.append(summary)
+                print(f"{n_sessions} session(s) x {n_rows} rows: {summary['reruns_per_s']} reruns/s, "
+                      f"{summary['failures']} failure(s), RSS {summary['rss_mb']} MB")
+                for error, count in errors.items():
+                    print(f"  {count} x {error}")
+
+    with pd.option_context("display.width", 160, "display.max_columns", 20):
+        print("\nRerun latency by page")
+        print(pd.DataFrame(page_rows).to_string(index=False))
+        print("\nThroughput and memory")
+        print(pd.DataFrame(summaries).to_string(index=False))
+
+    if output_path:
+        pd.DataFrame(page_rows).to_csv(output_path, index=False)
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+"""Bulk maintenance for the survey store, run outside the Streamlit app.
+
+Usage:
+    python maintenance.py compact
+    python maintenance.py rebuild [--from-sheets]
+    python maintenance.py gc-uploads [--apply] [--local-only]
+    python maintenance.py backup [--output PATH]
+    python maintenance.py restore ARCHIVE --yes
+    python maintenance.py reset --yes [--local-only]
+    python maintenance.py shard [--dry-run]
+"""
+import argparse
+import os
+import re
+import shutil
+import sys
+import time
+import zipfile
+from datetime import datetime
+
+import pandas as pd
+
+from survey_store import (
+    DATA_DIR,
+    DATE_FORMAT,
+    SHEET_ID,
+    SNAPSHOT_DIR,
+    SURVEY_COLUMNS,
+    UPLOADS_DIR,
+    apply_survey_schema,
+    extend_worksheet_header,
+    frame_seasons,
+    get_local_data_path,
+    list_snapshots,
+    parse_survey_dates,
+    read_latest_snapshot,
+    read_local_values,
+    rows_to_frame,
+    season_worksheet,
+    shard_season,
+    write_local_values,
+    write_snapshot,
+)
+from reports import REPORTS_DIR
+
+BACKUP_DIR = "backups"
+SCOPES = [
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive"
+]
+
+# -------------------------------
+# Helpers
+def read_local_store():
+    """Local survey CSV with the typed schema applied (empty frame if missing)"""
+    local_path = get_local_data_path()
+    if not os.path.exists(local_path):
+        return pd.DataFrame(columns=SURVEY_COLUMNS)
+    return apply_survey_schema(pd.read_csv(local_path))
+
+
+def sample_number(sample_id):
+    """Numeric part of a SARDI sample ID (0 when missing)"""
+    m = re.search(r"SARDI(\d+)", str(sample_id))
+    return int(m.group(1)) if m else 0
+
+def open_spreadsheet():
+    """Open the survey spreadsheet with service_account.json or .streamlit/secrets.toml"""
+    import gspread
+    from google.oauth2 import service_account
+
+    if os.path.exists("service_account.json"):
+        creds = service_account.Credentials.from_service_account_file("service_account.json", scopes=SCOPES)
+    else:
+        import tomllib
+
+        secrets_path = os.path.join(".streamlit", "secrets.toml")
+        if not os.path.exists(secrets_path):
+            raise RuntimeError("No Google Sheets credentials found (service_account.json or .streamlit/secrets.toml)")
+        with open(secrets_path, "rb") as f:
+            creds_dict = tomllib.load(f)["gcp_service_account"]
+        creds = service_account.Credentials.from_service_account_info(creds_dict, scopes=SCOPES)
+
+    return gspread.authorize(creds).open_by_key(SHEET_ID)
+
+def read_sheet_store():
+    """Every row in the Google Sheet (the first worksheet plus the season tabs) as one string frame"""
+    frames = []
+    for index, worksheet in enumerate(open_spreadsheet().worksheets()):
+        # The first worksheet holds rows from before sharding; other tabs count only if they are season tabs
+        if index == 0 or shard_season(worksheet.title) is not None:
+            values = worksheet.get_all_values()
+            if len(values) > 1:
+                frames.append(rows_to_frame(values))
+    return pd.concat(frames, ignore_index=True) if frames else rows_to_frame([])
+
+def confirm(args, action):
+    """Refuse destructive commands unless --yes was given"""
+    if not args.yes:
+        print(f"❌ Refusing to {action} without --yes.")
+        sys.exit(2)
+
+# -------------------------------
+# Commands
+def cmd_compact(args):
+    """Drop duplicate and empty rows, store dates as dd/mm/YYYY, sort by sample ID and rewrite the local store"""
+    # Work on the stored text: type inference would turn "007" into 7.0
+    df = read_local_values()
+    rows_before = len(df)
+
+    df = df[df.apply(lambda col: col.str.strip() != "").any(axis=1)]
+    if "date" in df.columns:
+        # Text that is not a date is kept as it is
+        dates = parse_survey_dates(df["date"])
+        df = df.assign(date=dates.dt.strftime(DATE_FORMAT).where(dates.notna(), df["date"]))
+    if "sample_id" in df.columns:
+        ids = df["sample_id"].str.strip()
+        has_id = ids != ""
+        with_id = df[has_id & ~ids.where(has_id).duplicated(keep="last")]
+        without_id = df[~has_id].drop_duplicates()
+        df = pd.concat([with_id, without_id], ignore_index=True)
+        df = df.sort_values("sample_id", key=lambda ids: ids.map(sample_number), kind="stable")
+    else:
+        df = df.drop_duplicates()
+    df = df.reset_index(drop=True)
+
+    write_local_values(df)
+    print(f"Local store compacted: {rows_before} -> {len(df)} rows")
+
+def cmd_rebuild(args):
+    """Replace all snapshots with a fresh one and drop stale report caches.
+
+    The snapshot is built from the local store, which only holds what this machine has saved or synced;
+    use --from-sheets to build it from the Google Sheet instead.
+    """
+    # Read before deleting anything, so a failed read leaves the current snapshots in place
+    df = apply_survey_schema(read_sheet_store()) if args.from_sheets else read_local_store()
+    for path in list_snapshots():
+        os.remove(path)
+    manifest = write_snapshot(df)
+    if manifest:
+        print(f"Snapshot {manifest['version']} written ({manifest['rows']} rows)")
+    else:
+        print("Local store is empty; no snapshot written")
+
+    # Reports are cached per data version; anything for other versions is stale
+    current_version = manifest["version"] if manifest else None
+    stale = [name for name in os.listdir(REPORTS_DIR) if name != current_version] if os.path.isdir(REPORTS_DIR) else []
+    for name in stale:
+        shutil.rmtree(os.path.join(REPORTS_DIR, name), ignore_errors=True)
+    print(f"Removed {len(stale)} stale report cache(s)")
+    print("Running apps pick up the new snapshot on their next rerun.")
+
+def cmd_gc_uploads(args):
+    """List photos in uploads/ that no survey record refers to; delete them only with --apply"""
+    sources = {
+        "local store": read_local_store,
+        "latest snapshot": lambda: read_latest_snapshot()[0],
+    }
+    if not args.local_only:
+        sources["Google Sheet"] = read_sheet_store
+
+    referenced = set()
+    for name, read in sources.items():
+        try:
+            df = read()
+        except Exception as e:
+            print(f"❌ Could not read the {name} ({e}); refusing to collect uploads.")
+            sys.exit(1)
+        if "photo_filename" in df.columns:
+            referenced.update(df["photo_filename"].dropna().astype(str).str.strip())
+    referenced.discard("")
+
+    uploads = []
+    if os.path.isdir(UPLOADS_DIR):
+        uploads = [name for name in os.listdir(UPLOADS_DIR) if os.path.isfile(os.path.join(UPLOADS_DIR, name))]
+    if uploads and not referenced:
+        # An empty or missing store would make every photo look orphaned
+        print(f"❌ No record refers to any of the {len(uploads)} upload(s); refusing to collect uploads.")
+        sys.exit(1)
+
+    orphans = [name for name in uploads if name not in referenced]
+    freed = sum(os.path.getsize(os.path.join(UPLOADS_DIR, name)) for name in orphans)
+
+    if args.apply:
+        for name in orphans:
+            os.remove(os.path.join(UPLOADS_DIR, name))
+    verb = "Deleted" if args.apply else "Would delete"
+    print(f"{verb} {len(orphans)} orphaned upload(s), {freed / 1024:,.1f} KB")
+    if orphans and not args.apply:
+        print("Run again with --apply to delete them.")
+
+def cmd_backup(args):
+    """Zip data/ and uploads/ into one archive"""
+    output = args.output or os.path.join(BACKUP_DIR, f"survey_backup_{datetime.now():%Y%m%d_%H%M%S}.zip")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+
+    n_files = 0
+    with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for root_dir in (DATA_DIR, UPLOADS_DIR):
+            for dirpath, _, filenames in os.walk(root_dir):
+                for name in filenames:
+                    zf.write(os.path.join(dirpath, name))
+                    n_files += 1
+    print(f"Backed up {n_files} file(s) to {output} ({os.path.getsize(output) / 1024:,.1f} KB)")
+
+def cmd_restore(args):
+    """Replace data/ and uploads/ with the contents of a backup archive"""
+    confirm(args, "overwrite data/ and uploads/")
+    with zipfile.ZipFile(args.archive) as zf:
+        members = zf.namelist()
+        allowed = (f"{DATA_DIR}/", f"{UPLOADS_DIR}/")
+        unsafe = [m for m in members if not m.startswith(allowed) or ".." in m.split("/")]
+        if unsafe:
+            print(f"❌ Archive contains unexpected paths: {unsafe[:5]}")
+            sys.exit(1)
+
+        for root_dir in (DATA_DIR, UPLOADS_DIR):
+            shutil.rmtree(root_dir, ignore_errors=True)
+            os.makedirs(root_dir, exist_ok=True)
+        zf.extractall(".")
+    print(f"Restored {len(members)} file(s) from {args.archive}")
+
+def cmd_reset(args):
+    """Empty the local store and snapshots, and reset the sheet to just the header row"""
+    confirm(args, "reset the survey data")
+
+    write_local_values(pd.DataFrame(columns=SURVEY_COLUMNS))
+    shutil.rmtree(SNAPSHOT_DIR, ignore_errors=True)
+    print("Local store reset to an empty table with the current columns")
+
+    if args.local_only:
+        return
+
+    spreadsheet = open_spreadsheet()
+    # A spreadsheet needs at least one worksheet: keep the first one, drop every other season tab
+    worksheet, *others = spreadsheet.worksheets()
+    season_tabs = [ws for ws in others if shard_season(ws.title) is not None]
+    header_row = {"values": [{"userEnteredValue": {"stringValue": col}} for col in SURVEY_COLUMNS]}
+    # Delete the season tabs, clear the first sheet and write the header in a single batchUpdate request
+    spreadsheet.batch_update({
+        "requests": [{"deleteSheet": {"sheetId": ws.id}} for ws in season_tabs] + [
+            {
+                "updateCells": {
+                    "range": {"sheetId": worksheet.id},
+                    "fields": "userEnteredValue",
+                }
+            },
+            {
+                "updateCells": {
+                    "start": {"sheetId": worksheet.id, "rowIndex": 0, "columnIndex": 0},
+                    "rows": [header_row],
+                    "fields": "userEnteredValue",
+                }
+            },
+        ]
+    })
+    print(f"Google Sheet reset to the header row ({len(season_tabs)} season tab(s) deleted)")
+
+def cmd_shard(args):
+    """Move rows from the pre-sharding first worksheet into one worksheet per season"""
+    spreadsheet = open_spreadsheet()
+    legacy = spreadsheet.worksheets()[0]
+    if shard_season(legacy.title) is not None:
+        print("The first worksheet is already a season tab; nothing to move")
+        return
+
+    values = legacy.get_all_values()
+    if len(values) <= 1:
+        print(f"No rows in '{legacy.title}'; nothing to move")
+        return
+    header, df = values[0], rows_to_frame(values)
+    seasons = frame_seasons(df)
+
+    for season in sorted(set(seasons)):
+        rows = df[seasons == season]
+        if args.dry_run:
+            print(f"Would move {len(rows)} row(s) to season {season}")
+            continue
+        worksheet = season_worksheet(spreadsheet, season, header)
+        tab_values = worksheet.get_all_values()
+        # A tab the app created has its own column order; write by column name, adding any columns it lacks
+        tab_header = extend_worksheet_header(worksheet, tab_values[0] if tab_values else [], header)
+        # Skip rows a previous, interrupted run already moved
+        existing = rows_to_frame(tab_values)
+        if "sample_id" in existing.columns and "sample_id" in rows.columns:
+            rows = rows[~rows["sample_id"].isin(set(existing["sample_id"]) - {""})]
+        if not rows.empty:
+            worksheet.append_rows(
+                rows.reindex(columns=tab_header, fill_value="").values.tolist(),
+                value_input_option="USER_ENTERED",
+            )
+        print(f"Moved {len(rows)} row(s) to '{worksheet.title}'")
+
+    if not args.dry_run:
+        legacy.clear()
+        legacy.append_row(header)
+        print(f"'{legacy.title}' now holds only the header row")
+
+COMMANDS = {
+    "compact": cmd_compact,
+    "rebuild": cmd_rebuild,
+    "gc-uploads": cmd_gc_uploads,
+    "backup": cmd_backup,
+    "restore": cmd_restore,
+    "reset": cmd_reset,
+    "shard": cmd_shard,
+}
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Bulk maintenance for the survey store (no Streamlit session needed).")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("compact", help="compact and re-index the local store")
+    rebuild_parser = subparsers.add_parser("rebuild", help="rebuild the snapshot from the local store and drop stale caches")
+    rebuild_parser.add_argument("--from-sheets", action="store_true", help="build the snapshot from the Google Sheet instead")
+    gc_parser = subparsers.add_parser("gc-uploads", help="list (or delete) photos no record refers to")
+    gc_parser.add_argument("--apply", action="store_true", help="delete the orphaned photos instead of only listing them")
+    gc_parser.add_argument("--local-only", action="store_true", help="do not read references from the Google Sheet")
+    backup_parser = subparsers.add_parser("backup", help="zip data/ and uploads/")
+    backup_parser.add_argument("--output", help="archive path (default: backups/survey_backup_<timestamp>.zip)")
+    restore_parser = subparsers.add_parser("restore", help="restore data/ and uploads/ from a backup archive")
+    restore_parser.add_argument("archive")
+    restore_parser.add_argument("--yes", action="store_true", help="confirm overwriting the current data")
+    reset_parser = subparsers.add_parser("reset", help="empty the local store and reset the sheet")
+    reset_parser.add_argument("--yes", action="store_true", help="confirm deleting all survey data")
+    reset_parser.add_argument("--local-only", action="store_true", help="leave the Google Sheet untouched")
+    shard_parser = subparsers.add_parser("shard", help="move rows from the first worksheet into one tab per season")
+    shard_parser.add_argument("--dry-run", action="store_true", help="only report how many rows would move")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    start = time.perf_counter()
+    COMMANDS[args.command](args)
+    print(f"✅ {args.command} finished in {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    main()
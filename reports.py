@@ -0,0 +1,158 @@
+"""Seasonal disease reports, rendered in worker processes.
+
+Nothing in here touches Streamlit so `render_report` can run in a ProcessPoolExecutor.
+"""
+import base64
+import hashlib
+import html
+import io
+import os
+import re
+from datetime import datetime
+
+import folium
+import pandas as pd
+import plotly.express as px
+from PIL import Image
+
+from survey_store import UPLOADS_DIR, disease_long_format, write_atomically
+
+REPORTS_DIR = "reports"
+THUMBNAIL_SIZE = (160, 160)
+MAX_THUMBNAILS = 24
+
+def slugify(value):
+    """Filesystem-safe version of a region or crop name"""
+    return re.sub(r"[^A-Za-z0-9]+", "-", str(value)).strip("-").lower() or "unknown"
+
+def path_component(value):
+    """Slug plus a short hash of the exact name, so names that slugify alike ("Clare", "clare") get their own files"""
+    digest = hashlib.sha1(str(value).encode("utf-8")).hexdigest()[:6]
+    return f"{slugify(value)}-{digest}"
+
+def report_path(version, season, region, crop):
+    """Where the report for one (season, region, crop) lives for a given data version"""
+    return os.path.join(REPORTS_DIR, version, f"{season}_{path_component(region)}_{path_component(crop)}.html")
+
+def plan_reports(df, version, seasons=None, regions=None, crops=None):
+    """One job per (season, region, crop) combination that has surveys"""
+    if df.empty or "date" not in df.columns:
+        return []
+
+    keys = pd.DataFrame({
+        "season": df["date"].dt.year,
+        "region": df["survey_location"].astype("string").fillna("Unknown"),
+        "crop": df["crop"].astype("string").fillna("Unknown"),
+    }).dropna(subset=["season"])
+    keys["season"] = keys["season"].astype(int)
+    if seasons:
+        keys = keys[keys["season"].isin(seasons)]
+    if regions:
+        keys = keys[keys["region"].isin(regions)]
+    if crops:
+        keys = keys[keys["crop"].isin(crops)]
+
+    jobs = []
+    for (season, region, crop), group in keys.groupby(["season", "region", "crop"]):
+        jobs.append({
+            "season": int(season),
+            "region": region,
+            "crop": crop,
+            "path": report_path(version, season, region, crop),
+            "records": df.loc[group.index],
+        })
+    return jobs
+
+def photo_thumbnail(photo_filename):
+    """Base64 JPEG thumbnail of an uploaded photo, or None if it cannot be read"""
+    try:
+        with Image.open(os.path.join(UPLOADS_DIR, photo_filename)) as img:
+            img = img.convert("RGB")
+            img.thumbnail(THUMBNAIL_SIZE)
+            buffer = io.BytesIO()
+            img.save(buffer, format="JPEG", quality=80)
+        return base64.b64encode(buffer.getvalue()).decode("ascii")
+    except Exception:
+        return None
+
+def render_report(job):
+    """Render one seasonal report to HTML and return its path"""
+    records = job["records"]
+    title = f"{job['crop']} disease report: {job['region']}, {job['season']} season"
+
+    # Same aggregation as the tracker graph: mean severity per disease across all slots
+    df_mean = (
+        disease_long_format(records)
+        .groupby("disease", as_index=False, observed=True)
+        .agg(mean_severity=("severity", "mean"), surveys=("disease", "size"))
+        .sort_values("mean_severity", ascending=False)
+    )
+    fig = px.bar(
+        df_mean,
+        x="disease",
+        y="mean_severity",
+        color="disease",
+        title="Mean Disease Severity by Disease Type",
+        labels={"mean_severity": "Mean Severity (%)", "disease": "Disease"},
+    )
+    chart_html = fig.to_html(full_html=False, include_plotlyjs="cdn")
+
+    located = records.dropna(subset=["latitude", "longitude"])
+    if not located.empty:
+        center = [float(located["latitude"].mean()), float(located["longitude"].mean())]
+    else:
+        center = [-34.96, 138.63]
+    m = folium.Map(location=center, zoom_start=9)
+    for _, row in located.iterrows():
+        folium.CircleMarker(
+            location=[float(row["latitude"]), float(row["longitude"])],
+            radius=6,
+            fill=True,
+            popup=f"{row['sample_id']}: {row['disease1']} ({row['severity1_percent']}%)",
+        ).add_to(m)
+    map_html = m.get_root().render()
+
+    thumbnails = []
+    if "photo_filename" in records.columns:
+        for photo_filename in records["photo_filename"].dropna().astype(str):
+            if photo_filename and len(thumbnails) < MAX_THUMBNAILS:
+                encoded = photo_thumbnail(photo_filename)
+                if encoded:
+                    thumbnails.append(
+                        f'<figure><img src="data:image/jpeg;base64,{encoded}">'
+                        f"<figcaption>{html.escape(photo_filename)}</figcaption></figure>"
+                    )
+
+    summary_columns = [col for col in ["sample_id", "date", "disease1", "severity1_percent", "disease2", "severity2_percent"] if col in records.columns]
+    summary = records[summary_columns].copy()
+    if "date" in summary.columns:
+        summary["date"] = summary["date"].dt.strftime("%d/%m/%Y")
+
+    page = f"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{html.escape(title)}</title>
+<style>
+body {{ font-family: sans-serif; margin: 2em; }}
+table {{ border-collapse: collapse; }}
+td, th {{ border: 1px solid #ccc; padding: 4px 8px; }}
+figure {{ display: inline-block; margin: 4px; font-size: 0.8em; }}
+</style>
+</head>
+<body>
+<h1>{html.escape(title)}</h1>
+<p>{len(records)} surveys. Generated {datetime.now():%d/%m/%Y %H:%M}.</p>
+{chart_html}
+<h2>Survey locations</h2>
+<iframe srcdoc="{html.escape(map_html)}" width="100%" height="450" style="border:none"></iframe>
+<h2>Surveys</h2>
+{summary.to_html(index=False, na_rep="")}
+<h2>Photos</h2>
+{"".join(thumbnails) or "<p>No photos.</p>"}
+</body>
+</html>
+"""
+    os.makedirs(os.path.dirname(job["path"]), exist_ok=True)
+    write_atomically(job["path"], lambda f: f.write(page), mode="w", encoding="utf-8")
+    return job["path"]
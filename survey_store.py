@@ -0,0 +1,552 @@
+"""Survey data storage helpers shared by the Streamlit app and the maintenance CLI.
+
+Nothing in here touches Streamlit, so it can be imported outside a running app.
+"""
+import hashlib
+import json
+import math
+import os
+import re
+import tempfile
+import threading
+import warnings
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# -------------------------------
+# Locations
+DATA_DIR = "data"
+UPLOADS_DIR = "uploads"
+SNAPSHOT_DIR = os.path.join(DATA_DIR, "snapshots")
+SNAPSHOT_MANIFEST = os.path.join(SNAPSHOT_DIR, "latest.json")
+SNAPSHOTS_TO_KEEP = 3
+
+SHEET_ID = "15D6_hA_LhG6M8CKMUFikCxXPQNtxhNBSCykaBF2egtE"
+
+def get_local_data_path():
+    """Get the path to the local data file with proper handling for cloud deployments"""
+    return os.path.join(DATA_DIR, "local_disease_data.csv")
+
+def write_atomically(path, write, mode="wb", **open_kwargs):
+    """Call `write(f)` on a temporary file of this writer's own next to `path`, then move it into place"""
+    f = tempfile.NamedTemporaryFile(mode, dir=os.path.dirname(path) or ".", suffix=".tmp", delete=False, **open_kwargs)
+    try:
+        with f:
+            write(f)
+        os.replace(f.name, path)
+    except BaseException:
+        if os.path.exists(f.name):
+            os.remove(f.name)
+        raise
+
+# -------------------------------
+# Season shards: one worksheet per survey year (the first worksheet is the pre-sharding store)
+SHARD_TITLE_PREFIX = "Season "
+
+def shard_title(season):
+    """Worksheet title for a season"""
+    return f"{SHARD_TITLE_PREFIX}{season}"
+
+def shard_season(title):
+    """Season of a shard worksheet title, or None for any other worksheet"""
+    m = re.fullmatch(rf"{SHARD_TITLE_PREFIX}(\d{{4}})", title)
+    return int(m.group(1)) if m else None
+
+def current_season():
+    """The season still receiving submissions; every earlier season is closed"""
+    return datetime.now().year
+
+def record_season(date_value):
+    """Season of a record from a Timestamp or dd/mm/YYYY date; undated records go to the current season"""
+    date = parse_survey_dates(pd.Series([date_value], dtype=object)).iloc[0]
+    return current_season() if pd.isna(date) else int(date.year)
+
+def frame_seasons(df):
+    """Season of every row of a survey frame"""
+    if "date" not in df.columns:
+        return pd.Series(current_season(), index=df.index)
+    return parse_survey_dates(df["date"]).dt.year.fillna(current_season()).astype(int)
+
+def season_worksheet(spreadsheet, season, header):
+    """The season's worksheet, created with a header row on first use"""
+    import gspread
+
+    title = shard_title(season)
+    try:
+        return spreadsheet.worksheet(title)
+    except gspread.exceptions.WorksheetNotFound:
+        pass
+    try:
+        worksheet = spreadsheet.add_worksheet(title=title, rows=1000, cols=max(len(header), 26))
+    except gspread.exceptions.APIError:
+        # Another session created it in the meantime
+        return spreadsheet.worksheet(title)
+    worksheet.append_row(list(header))
+    return worksheet
+
+def extend_worksheet_header(worksheet, header, columns):
+    """Append the `columns` missing from a worksheet's `header` row to it; returns the header now in place"""
+    import gspread
+
+    missing = [col for col in columns if col and col not in header]
+    if not missing:
+        return list(header)
+    extended = list(header) + missing
+    if len(extended) > worksheet.col_count:
+        worksheet.add_cols(len(extended) - worksheet.col_count)
+    worksheet.batch_update(
+        [{"range": f"A1:{gspread.utils.rowcol_to_a1(1, len(extended))}", "values": [extended]}],
+        value_input_option="RAW",
+    )
+    return extended
+
+# -------------------------------
+# Stored date format
+DATE_FORMAT = "%d/%m/%Y"
+
+def parse_survey_dates(values):
+    """Parse stored dates: dd/mm/YYYY as the app writes them, with a strict ISO fallback for older rewrites"""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    text = values.astype("string").str.strip()
+    dates = pd.to_datetime(text, format=DATE_FORMAT, errors="coerce")
+    unparsed = dates.isna() & text.notna() & (text != "")
+    if unparsed.any():
+        dates[unparsed] = pd.to_datetime(text[unparsed], format="ISO8601", errors="coerce")
+    return dates
+
+# -------------------------------
+# Stored coordinate format
+COORDINATE_COLUMNS = ("latitude", "longitude")
+
+def format_coordinates(values):
+    """Coordinates as 6-decimal text (blank when missing), so float32 binary noise is never written back"""
+    if values.dtype == "float32":
+        # Widen through the shortest text that round-trips the float32, not its exact binary value
+        values = values.astype(str)
+    numbers = pd.to_numeric(values, errors="coerce").astype("float64")
+    return numbers.map("{:.6f}".format).where(numbers.notna(), "")
+
+def serialize_survey_frame(df):
+    """Copy of a survey frame in the stored text layout (dd/mm/YYYY dates, 6-decimal coordinates), for the CSV and Sheets"""
+    df = df.copy()
+    if "date" in df.columns and pd.api.types.is_datetime64_any_dtype(df["date"]):
+        df["date"] = df["date"].dt.strftime(DATE_FORMAT)
+    for col in COORDINATE_COLUMNS:
+        # Coordinates already held as text are written back as they are
+        if col in df.columns and pd.api.types.is_float_dtype(df[col]):
+            df[col] = format_coordinates(df[col])
+    return df
+
+# -------------------------------
+# Local survey file
+def read_local_values():
+    """Local survey file exactly as stored (all strings)"""
+    local_path = get_local_data_path()
+    if not os.path.exists(local_path):
+        return pd.DataFrame(columns=SURVEY_COLUMNS)
+    return pd.read_csv(local_path, dtype=str, keep_default_na=False)
+
+# Held across every read-modify-write of the local file in this process (Save, Sync and the reconcile thread)
+local_file_lock = threading.RLock()
+
+def write_local_values(df):
+    """Replace the local survey file with `df` in the stored text layout (atomic, so readers never see half a file)"""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    stored = serialize_survey_frame(df)
+    with local_file_lock:
+        write_atomically(get_local_data_path(), lambda f: stored.to_csv(f, index=False), mode="w", newline="")
+
+def append_local_values(rows):
+    """Append `rows` to the local survey file in the stored text layout, leaving the stored rows as they are"""
+    new = serialize_survey_frame(rows)
+    with local_file_lock:
+        local = read_local_values()
+        columns = list(local.columns) + [col for col in new.columns if col not in local.columns]
+        write_local_values(pd.concat(
+            [local.reindex(columns=columns, fill_value=""), new.reindex(columns=columns, fill_value="")],
+            ignore_index=True,
+        ))
+
+# -------------------------------
+# Typed schema for the survey records (mirrors the `new_record` dict on the Tag page)
+SURVEY_SCHEMA = {
+    "sample_id": "string",
+    "date": "datetime64[ns]",
+    "collector_name": "category",
+    "field_type": "string",
+    "Agronomist": "string",
+    "crop": "category",
+    "variety": "string",
+    "plant_stage": "category",
+    "disease1": "category",
+    "disease2": "category",
+    "disease3": "category",
+    "severity1_percent": "UInt8",
+    "severity2_percent": "UInt8",
+    "severity3_percent": "UInt8",
+    "latitude": "float32",
+    "longitude": "float32",
+    "survey_location": "string",
+    "photo_filename": "string",
+    "field_notes": "string",
+    "Action": "string",
+    "sample_taken": "category",
+    "sample_type": "category",
+}
+SURVEY_COLUMNS = list(SURVEY_SCHEMA)
+
+def apply_survey_schema(df):
+    """Coerce known survey columns to compact dtypes and record memory usage before/after"""
+    if df.empty:
+        return df
+
+    memory_before = int(df.memory_usage(deep=True).sum())
+    df = df.copy()
+
+    for col, dtype in SURVEY_SCHEMA.items():
+        if col not in df.columns:
+            continue
+        try:
+            if dtype == "datetime64[ns]":
+                # Never guess day/month order: ISO dates read with dayfirst would swap them
+                df[col] = parse_survey_dates(df[col])
+            elif dtype == "UInt8":
+                # Severity is a whole percentage between 0 and 100
+                values = pd.to_numeric(df[col], errors="coerce").round().clip(0, 100)
+                df[col] = values.astype("UInt8")
+            elif dtype == "float32":
+                df[col] = pd.to_numeric(df[col], errors="coerce").astype("float32")
+            elif dtype == "category":
+                # Go through "string" so numbers and text from Sheets/CSV share one category set
+                df[col] = df[col].astype("string").astype("category")
+            else:
+                df[col] = df[col].astype("string")
+        except Exception as e:
+            warnings.warn(f"Could not apply schema to column {col}: {e}")
+
+    df.attrs["memory_usage"] = {
+        "before": memory_before,
+        "after": int(df.memory_usage(deep=True).sum()),
+    }
+    return df
+
+def data_version(df):
+    """Return a fingerprint of the dataset contents, used to key derived caches"""
+    if df.empty:
+        return "empty"
+    row_hashes = pd.util.hash_pandas_object(df, index=False)
+    return f"{len(df)}-{int(row_hashes.sum()):016x}"
+
+def layout_version(df):
+    """Fingerprint of the contents and the row order, for caches that hold row positions (data_version ignores order)"""
+    if df.empty:
+        return "empty"
+    row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return f"{len(df)}-{hashlib.blake2b(row_hashes.tobytes(), digest_size=8).hexdigest()}"
+
+def version_checksum(version):
+    """(rows, row-hash sum) encoded in a data_version() string; sums of disjoint row sets add up mod 2**64"""
+    if version == "empty":
+        return 0, 0
+    n_rows, checksum = version.split("-")
+    return int(n_rows), int(checksum, 16)
+
+# -------------------------------
+# Long format: one row per recorded disease slot
+DISEASE_SLOTS = (1, 2, 3)
+NO_DISEASE_VALUES = {"", "None", "nan"}
+DISEASE_LONG_COLUMNS = ["row", "sample_id", "slot", "disease", "severity"]
+
+def disease_long_format(df):
+    """(row, sample_id, slot, disease, severity) for every filled disease slot; `row` is the position in `df`"""
+    parts = []
+    for slot in DISEASE_SLOTS:
+        disease_col, severity_col = f"disease{slot}", f"severity{slot}_percent"
+        if disease_col not in df.columns:
+            continue
+        diseases = df[disease_col].astype("string").str.strip()
+        rows = np.flatnonzero((diseases.notna() & ~diseases.isin(NO_DISEASE_VALUES)).to_numpy(dtype=bool))
+        if severity_col in df.columns:
+            severity = pd.to_numeric(df[severity_col], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)[rows]
+        else:
+            severity = np.full(len(rows), np.nan)
+        parts.append(pd.DataFrame({
+            "row": rows,
+            "sample_id": df["sample_id"].astype("string").to_numpy()[rows] if "sample_id" in df.columns else pd.NA,
+            "slot": np.full(len(rows), slot, dtype=np.uint8),
+            "disease": diseases.to_numpy(dtype=object)[rows],
+            "severity": severity,
+        }))
+
+    if not parts:
+        return pd.DataFrame(columns=DISEASE_LONG_COLUMNS)
+    long = pd.concat(parts, ignore_index=True)
+    long["disease"] = long["disease"].astype("category")
+    return long
+
+# -------------------------------
+# Columnar snapshots (Arrow IPC, memory-mapped on cold start)
+def read_snapshot_manifest():
+    """Return the manifest of the latest snapshot, or None"""
+    try:
+        with open(SNAPSHOT_MANIFEST) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def list_snapshots():
+    """Snapshot files, newest first"""
+    if not os.path.isdir(SNAPSHOT_DIR):
+        return []
+    return sorted(
+        (os.path.join(SNAPSHOT_DIR, name) for name in os.listdir(SNAPSHOT_DIR) if name.endswith(".arrow")),
+        key=os.path.getmtime,
+        reverse=True,
+    )
+
+def write_snapshot(df, keep=SNAPSHOTS_TO_KEEP):
+    """Write a typed, uncompressed Arrow IPC snapshot of `df` and point the manifest at it"""
+    if df.empty:
+        return None
+
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    version = data_version(df)
+    path = os.path.join(SNAPSHOT_DIR, f"survey_{version}.arrow")
+    if not os.path.exists(path):
+        # Uncompressed so readers can memory-map the columns instead of decoding them
+        write_atomically(path, lambda f: df.reset_index(drop=True).to_feather(f, compression="uncompressed"))
+
+    manifest = {
+        "version": version,
+        "path": path,
+        "rows": len(df),
+        "written_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    write_atomically(SNAPSHOT_MANIFEST, lambda f: json.dump(manifest, f), mode="w")
+
+    # Keep only the newest few snapshots (another writer may be pruning the same files)
+    for old_path in list_snapshots()[keep:]:
+        if old_path != path:
+            try:
+                os.remove(old_path)
+            except FileNotFoundError:
+                pass
+    return manifest
+
+def read_latest_snapshot():
+    """Memory-map the latest snapshot; returns (DataFrame, version) or (empty DataFrame, None).
+
+    The mapping skips parsing and decompression, but to_pandas() still copies the columns into the
+    NumPy/pandas dtypes the app works with; keeping them in the mapped file would need ArrowDtype columns.
+    """
+    manifest = read_snapshot_manifest()
+    if not manifest or not os.path.exists(manifest["path"]):
+        return pd.DataFrame(), None
+
+    import pyarrow as pa
+
+    with pa.memory_map(manifest["path"], "r") as source:
+        df = pa.ipc.open_file(source).read_all().to_pandas()
+    return df, manifest["version"]
+
+# -------------------------------
+# Local/cloud reconciliation (per-row hashes, compared block by block)
+SYNC_BLOCK_SIZE = 500
+
+def rows_to_frame(values):
+    """DataFrame from a header row plus data rows, as returned by Worksheet.get_all_values()"""
+    if not values:
+        return pd.DataFrame(columns=SURVEY_COLUMNS)
+    header, rows = values[0], values[1:]
+    return pd.DataFrame([row + [""] * (len(header) - len(row)) for row in rows], columns=header)
+
+def normalize_survey_rows(df):
+    """Canonical string form of the survey columns, so equal records hash equally whichever store they came from"""
+    if df.empty:
+        return pd.DataFrame(columns=SURVEY_COLUMNS, dtype="string")
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        typed = apply_survey_schema(df)
+    normalized = pd.DataFrame(index=typed.index)
+    for col, dtype in SURVEY_SCHEMA.items():
+        if col not in typed.columns:
+            normalized[col] = ""
+            continue
+        values = typed[col]
+        if dtype == "datetime64[ns]":
+            text = values.dt.strftime("%d/%m/%Y")
+        elif dtype == "float32":
+            # Compare at the float32 precision the app holds, so a typed frame written back matches its source text
+            text = format_coordinates(values)
+        else:
+            text = values.astype("string")
+        normalized[col] = text.astype("string").fillna("").str.strip()
+    return normalized.reset_index(drop=True)
+
+def keyed_survey_rows(df):
+    """Normalized rows indexed by sample ID (last copy wins) and their row hashes"""
+    rows = normalize_survey_rows(df)
+    hashes = pd.util.hash_pandas_object(rows, index=False).to_numpy()
+    # Rows without an ID can only match an identical row on the other side
+    keys = rows["sample_id"].where(rows["sample_id"] != "", pd.Series(hashes, dtype="string").radd("#"))
+    rows.index = pd.Index(keys, name="key")
+    hashes = pd.Series(hashes, index=rows.index)
+    keep = ~rows.index.duplicated(keep="last")
+    return rows[keep], hashes[keep]
+
+def block_checksums(hashes, n_blocks):
+    """Wrapping sum of the row hashes in each block; a row's block depends only on its key"""
+    blocks = (pd.util.hash_pandas_object(hashes.index.to_series(), index=False).to_numpy() % n_blocks).astype(np.int64)
+    sums = np.zeros(n_blocks, dtype=np.uint64)
+    np.add.at(sums, blocks, hashes.to_numpy(dtype=np.uint64))
+    return blocks, sums
+
+def checksum_of(hashes):
+    """Whole-table checksum in the data_version() format"""
+    return f"{len(hashes)}-{int(hashes.to_numpy(dtype=np.uint64).sum()):016x}" if len(hashes) else "empty"
+
+def reconcile_surveys(local_df, cloud_df, block_size=SYNC_BLOCK_SIZE):
+    """Dry run: compare local and cloud rows block by block and return what differs (nothing is written)"""
+    local_rows, local_hashes = keyed_survey_rows(local_df)
+    cloud_rows, cloud_hashes = keyed_survey_rows(cloud_df)
+
+    # Only rows in blocks whose checksums differ are compared one by one
+    n_blocks = max(1, math.ceil(max(len(local_rows), len(cloud_rows)) / block_size))
+    local_blocks, local_sums = block_checksums(local_hashes, n_blocks)
+    cloud_blocks, cloud_sums = block_checksums(cloud_hashes, n_blocks)
+    differing = np.flatnonzero(local_sums != cloud_sums)
+    local_checksum, cloud_checksum = checksum_of(local_hashes), checksum_of(cloud_hashes)
+
+    local_hashes = local_hashes[np.isin(local_blocks, differing)]
+    cloud_hashes = cloud_hashes[np.isin(cloud_blocks, differing)]
+    local_only = local_hashes.index.difference(cloud_hashes.index, sort=False)
+    cloud_only = cloud_hashes.index.difference(local_hashes.index, sort=False)
+    shared = local_hashes.index.intersection(cloud_hashes.index, sort=False)
+    changed = shared[local_hashes[shared].to_numpy() != cloud_hashes[shared].to_numpy()]
+
+    return {
+        "local_rows": len(local_rows),
+        "cloud_rows": len(cloud_rows),
+        "blocks": n_blocks,
+        "blocks_differing": len(differing),
+        "identical": len(local_rows) - len(local_only) - len(changed),
+        "local_only": local_rows.loc[local_only],
+        "cloud_only": cloud_rows.loc[cloud_only],
+        "changed_local": local_rows.loc[changed],
+        "changed_cloud": cloud_rows.loc[changed],
+        "local_checksum": local_checksum,
+        "cloud_checksum": cloud_checksum,
+    }
+
+# -------------------------------
+# Keyed writes to the Google Sheet (only the records and cells that changed)
+def locate_sheet_rows(sheets):
+    """({title: header}, {sample ID: [(worksheet, row number, {column: cell})]}) for [(worksheet, values)] pairs"""
+    headers, locations = {}, {}
+    for worksheet, values in sheets:
+        if not values:
+            continue
+        header = values[0]
+        headers[worksheet.title] = header
+        if "sample_id" not in header:
+            continue
+        id_col = header.index("sample_id")
+        for row_number, row in enumerate(values[1:], start=2):
+            if len(row) > id_col and row[id_col].strip():
+                cells = dict(zip(header, row + [""] * (len(header) - len(row))))
+                locations.setdefault(row[id_col].strip(), []).append((worksheet, row_number, cells))
+    return headers, locations
+
+def write_sheet_rows_by_key(spreadsheet, sheets, rows, deleted_keys=(), forget_seasons=None):
+    """Write normalized `rows` by sample ID and delete `deleted_keys`; returns (appended, updated, deleted).
+
+    `sheets` is every tab as [(worksheet, values)]. A row already in the sheet only has the cells whose
+    normalized value changed rewritten, so columns outside the schema and the stored text of unchanged cells
+    are kept; it moves tab when its season changed. Other rows are appended to their season tab, so records
+    other sessions wrote in the meantime are left alone. `forget_seasons` is called with every season tab
+    written to, even when a write fails part-way.
+    """
+    import gspread
+
+    headers, locations = locate_sheet_rows(sheets)
+    seasons = frame_seasons(rows).to_numpy()
+
+    # The current copies of the rows, normalized like `rows`, to find the cells that actually changed
+    found = [locations[key][-1] if key in locations else None for key in rows.index]
+    current = normalize_survey_rows(pd.DataFrame([location[2] for location in found if location is not None]))
+    owned = [col for col in rows.columns if col in SURVEY_COLUMNS]
+
+    updates, removals, appends, updated = {}, [], {}, 0
+    current_rows = iter(current.to_dict("records"))
+    for position, (key, row) in enumerate(rows.iterrows()):
+        location = found[position]
+        if location is None:
+            appends.setdefault(seasons[position], []).append({col: row[col] for col in owned})
+            continue
+        worksheet, row_number, cells = location
+        normalized = next(current_rows)
+        changed = {col: row[col] for col in owned if row[col] != normalized[col]}
+        # Rows still in the unsharded first sheet are updated there; `shard` moves them later
+        if shard_season(worksheet.title) in (None, seasons[position]):
+            if changed:
+                updates.setdefault(worksheet.title, (worksheet, {}))[1][row_number] = changed
+                updated += 1
+        else:
+            removals.append((worksheet, row_number))
+            appends.setdefault(seasons[position], []).append({**cells, **changed})
+    deleted = 0
+    for key in deleted_keys:
+        removals.extend((worksheet, row_number) for worksheet, row_number, _ in locations.get(key, []))
+        deleted += len(locations.get(key, []))
+
+    touched = set()
+    try:
+        for worksheet, changes in updates.values():
+            touched.add(worksheet.title)
+            header = headers[worksheet.title] = extend_worksheet_header(
+                worksheet, headers[worksheet.title], [col for cells in changes.values() for col in cells]
+            )
+            worksheet.batch_update(
+                [
+                    {"range": gspread.utils.rowcol_to_a1(row_number, header.index(col) + 1), "values": [[value]]}
+                    for row_number, cells in changes.items()
+                    for col, value in cells.items()
+                ],
+                value_input_option="USER_ENTERED",
+            )
+
+        if removals:
+            touched.update(worksheet.title for worksheet, _ in removals)
+            # Bottom-up within each tab, so a deletion never shifts a row still to be deleted
+            removals.sort(key=lambda location: (location[0].id, location[1]), reverse=True)
+            spreadsheet.batch_update({"requests": [
+                {"deleteDimension": {"range": {
+                    "sheetId": worksheet.id, "dimension": "ROWS", "startIndex": row_number - 1, "endIndex": row_number,
+                }}}
+                for worksheet, row_number in removals
+            ]})
+
+        for season, records in sorted(appends.items()):
+            worksheet = season_worksheet(spreadsheet, season, SURVEY_COLUMNS)
+            touched.add(worksheet.title)
+            header = headers.get(worksheet.title)
+            if header is None:
+                values = worksheet.get_all_values()
+                header = values[0] if values else []
+            # Moved rows bring their extra columns with them
+            header = headers[worksheet.title] = extend_worksheet_header(
+                worksheet, header, [col for record in records for col, value in record.items() if value != ""]
+            )
+            worksheet.append_rows(
+                [[record.get(col, "") for col in header] for record in records],
+                value_input_option="USER_ENTERED",
+            )
+    finally:
+        if forget_seasons is not None:
+            forget_seasons([season for season in map(shard_season, touched) if season is not None])
+
+    return sum(len(records) for records in appends.values()), updated, deleted
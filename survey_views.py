@@ -0,0 +1,312 @@
+"""Derived survey views (severity trends and the like) built from the typed survey frame.
+
+Nothing in here touches Streamlit; app.py keeps the process-wide caches around these.
+"""
+import numpy as np
+import pandas as pd
+
+from survey_store import data_version, disease_long_format, parse_survey_dates, version_checksum
+
+# -------------------------------
+# Severity trends (pre-bucketed time-window aggregates)
+TREND_FREQUENCIES = {"Weekly": "W", "Monthly": "M"}
+
+def bucket_trend_rows(df):
+    """Bucket survey rows into weekly and monthly partial sums per crop and disease (all disease slots)"""
+    required = {"date", "crop", "disease1"}
+    if df.empty or not required.issubset(df.columns):
+        return None
+
+    rows = df[df["date"].notna()]
+    crops = rows["crop"].astype("string").fillna("Unknown").to_numpy(dtype=object)
+    entries = disease_long_format(rows)
+    positions = entries["row"].to_numpy(dtype=np.int64)
+    base = pd.DataFrame({
+        "crop": crops[positions],
+        "disease": entries["disease"].astype("string").to_numpy(dtype=object),
+        "severity": entries["severity"].astype("float64").to_numpy(),
+    })
+    base["infected"] = base["severity"] > 0
+    base["severity_count"] = base["severity"].notna()
+    base["severity_sum"] = base["severity"].fillna(0.0)
+
+    aggs = {}
+    for freq in TREND_FREQUENCIES.values():
+        periods = rows["date"].dt.to_period(freq).dt.start_time.to_numpy()
+        surveys = pd.DataFrame({"period": periods, "crop": crops}).groupby(["period", "crop"]).size().to_frame("n_surveys")
+        base["period"] = periods[positions]
+        reports = (
+            base
+            .groupby(["period", "crop", "disease"])
+            .agg(
+                n_reports=("disease", "size"),
+                n_infected=("infected", "sum"),
+                severity_sum=("severity_sum", "sum"),
+                severity_count=("severity_count", "sum"),
+            )
+        )
+        aggs[freq] = {"surveys": surveys, "reports": reports}
+    return aggs
+
+def merge_trend_aggregates(current, update):
+    """Add the partial sums in `update` onto `current`"""
+    if current is None:
+        return update
+    if update is None:
+        return current
+    merged = {}
+    for freq, tables in current.items():
+        merged[freq] = {
+            name: pd.concat([table, update[freq][name]]).groupby(level=list(range(table.index.nlevels))).sum()
+            for name, table in tables.items()
+        }
+    return merged
+
+def fold_trend_aggregates(entries, df, version, max_versions):
+    """Trend aggregates for `df` from an LRU of {version: entry}, folding in only new submissions when possible"""
+    if version in entries:
+        entries.move_to_end(version)
+        return entries[version]["aggs"]
+
+    aggs = None
+    if entries and "sample_id" in df.columns:
+        # Only appends since the most recent build: its rows must be unchanged
+        latest_version, latest = next(reversed(entries.items()))
+        seen = df["sample_id"].isin(latest["sample_ids"])
+        if int(seen.sum()) == len(latest["sample_ids"]) and data_version(df[seen]) == latest_version:
+            aggs = merge_trend_aggregates(latest["aggs"], bucket_trend_rows(df[~seen]))
+
+    if aggs is None:
+        aggs = bucket_trend_rows(df)
+
+    entries[version] = {
+        "sample_ids": set(df["sample_id"]) if "sample_id" in df.columns else set(),
+        "aggs": aggs,
+    }
+    while len(entries) > max_versions:
+        entries.popitem(last=False)
+    return aggs
+
+def build_trend_view(aggs, freq, crop, disease, start, end, window):
+    """Per-disease severity and incidence over time for the selected filters"""
+    surveys = aggs[freq]["surveys"].reset_index()
+    reports = aggs[freq]["reports"].reset_index()
+
+    # Buckets are labelled by their first day; keep the one holding `start` too
+    first = pd.Timestamp(start).to_period(freq).start_time
+    surveys = surveys[(surveys["period"] >= first) & (surveys["period"] <= end)]
+    reports = reports[(reports["period"] >= first) & (reports["period"] <= end)]
+    if crop != "All":
+        surveys = surveys[surveys["crop"] == crop]
+        reports = reports[reports["crop"] == crop]
+    if disease != "All":
+        reports = reports[reports["disease"] == disease]
+    if reports.empty:
+        return pd.DataFrame()
+
+    surveys = surveys.groupby("period")["n_surveys"].sum()
+    view = reports.groupby(["disease", "period"], as_index=False)[
+        ["n_reports", "n_infected", "severity_sum", "severity_count"]
+    ].sum()
+    view["mean_severity"] = view["severity_sum"] / view["severity_count"].where(view["severity_count"] > 0)
+    view["incidence_percent"] = 100 * view["n_infected"] / view["period"].map(surveys)
+
+    # Rolling mean over a gap-free period axis so missing weeks/months count as gaps, not neighbours
+    period_freq = "W-MON" if freq == "W" else "MS"
+    rolling = []
+    for _, part in view.groupby("disease", sort=False):
+        series = part.set_index("period")["mean_severity"]
+        full_index = pd.date_range(series.index.min(), series.index.max(), freq=period_freq)
+        smoothed = series.reindex(full_index).rolling(window, min_periods=1).mean()
+        rolling.append(smoothed.reindex(series.index).set_axis(part.index))
+    view["rolling_mean_severity"] = pd.concat(rolling)
+
+    view["season"] = view["period"].dt.year.astype(str)
+    if freq == "W":
+        view["season_position"] = view["period"].dt.isocalendar().week.astype(int)
+    else:
+        view["season_position"] = view["period"].dt.month
+    return view.sort_values(["disease", "period"])
+
+def build_season_comparison(view):
+    """Collapse a trend view across diseases and compare each season with the one before"""
+    combined = view.groupby(["season", "season_position"], as_index=False)[
+        ["severity_sum", "severity_count", "n_infected", "n_reports"]
+    ].sum()
+    combined["mean_severity"] = combined["severity_sum"] / combined["severity_count"].where(combined["severity_count"] > 0)
+
+    summary = view.groupby("season")[["severity_sum", "severity_count", "n_infected", "n_reports"]].sum()
+    summary["mean_severity"] = (summary["severity_sum"] / summary["severity_count"].where(summary["severity_count"] > 0)).round(1)
+    summary["change_vs_previous"] = summary["mean_severity"].diff().round(1)
+    summary = summary[["n_reports", "n_infected", "mean_severity", "change_vs_previous"]].reset_index()
+    return combined, summary
+
+# -------------------------------
+# Spatial index for "nearby reports"
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.195
+
+def haversine_km(lat, lon, lats, lons):
+    """Great-circle distance in km from one point to arrays of points"""
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+class SpatialGridIndex:
+    """Uniform lat/lon grid over survey coordinates answering radius (and recency) queries"""
+
+    def __init__(self, df, cell_deg=0.25):
+        self.cell_deg = cell_deg
+        self.cells = {}
+
+        if df.empty or "latitude" not in df.columns or "longitude" not in df.columns:
+            self.positions = np.empty(0, dtype=np.int64)
+            return
+
+        lats = pd.to_numeric(df["latitude"], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+        lons = pd.to_numeric(df["longitude"], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+        # 0,0 is the Tag page fallback when no GPS fix was available
+        valid = np.isfinite(lats) & np.isfinite(lons) & ~((lats == 0) & (lons == 0))
+        positions = np.flatnonzero(valid)
+
+        lat_cells = np.floor(lats[positions] / cell_deg).astype(np.int64)
+        lon_cells = np.floor(lons[positions] / cell_deg).astype(np.int64)
+        order = np.lexsort((lon_cells, lat_cells))
+
+        # Sort by cell so every cell is one contiguous slice of the arrays below
+        self.positions = positions[order]
+        self.lats = lats[self.positions]
+        self.lons = lons[self.positions]
+        if "date" in df.columns:
+            self.dates = df["date"].to_numpy(dtype="datetime64[ns]")[self.positions]
+        else:
+            self.dates = None
+
+        cell_keys = np.stack([lat_cells[order], lon_cells[order]], axis=1)
+        if len(cell_keys):
+            starts = np.flatnonzero(np.any(np.diff(cell_keys, axis=0) != 0, axis=1)) + 1
+            starts = np.concatenate([[0], starts])
+            ends = np.concatenate([starts[1:], [len(cell_keys)]])
+            for start, end in zip(starts, ends):
+                self.cells[(int(cell_keys[start, 0]), int(cell_keys[start, 1]))] = (start, end)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def query(self, lat, lon, radius_km, since=None):
+        """Return (row positions, distances in km) of reports within `radius_km`, nearest first"""
+        dlat = radius_km / KM_PER_DEGREE
+        dlon = radius_km / (KM_PER_DEGREE * max(np.cos(np.radians(lat)), 1e-6))
+        lat_range = range(int(np.floor((lat - dlat) / self.cell_deg)), int(np.floor((lat + dlat) / self.cell_deg)) + 1)
+        lon_range = range(int(np.floor((lon - dlon) / self.cell_deg)), int(np.floor((lon + dlon) / self.cell_deg)) + 1)
+
+        slices = [self.cells[(i, j)] for i in lat_range for j in lon_range if (i, j) in self.cells]
+        if not slices:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        candidates = np.concatenate([np.arange(start, end) for start, end in slices])
+
+        distances = haversine_km(lat, lon, self.lats[candidates], self.lons[candidates])
+        keep = distances <= radius_km
+        if since is not None and self.dates is not None:
+            keep &= self.dates[candidates] >= np.datetime64(since, "ns")
+
+        candidates, distances = candidates[keep], distances[keep]
+        order = np.argsort(distances, kind="stable")
+        return self.positions[candidates[order]], distances[order]
+
+# -------------------------------
+# Disease index over the long format (disease1/2/3 stacked into one column)
+ENTRY_CONTEXT_COLUMNS = ["date", "crop", "survey_location", "latitude", "longitude"]
+
+class DiseaseIndex:
+    """Long-format disease entries sorted by disease, so each disease's entries are one contiguous slice"""
+
+    def __init__(self, df):
+        self.n_rows = len(df)
+        self.long = disease_long_format(df).sort_values(["disease", "row"], kind="stable").reset_index(drop=True)
+        self.entry_rows = self.long["row"].to_numpy(dtype=np.int64)
+
+        self.slices = {}
+        if not self.long.empty:
+            categories = self.long["disease"].cat.categories
+            bounds = np.searchsorted(self.long["disease"].cat.codes.to_numpy(), np.arange(len(categories) + 1))
+            for i, name in enumerate(categories):
+                if bounds[i + 1] > bounds[i]:
+                    self.slices[str(name)] = slice(bounds[i], bounds[i + 1])
+        self.diseases = sorted(self.slices)
+
+    def row_mask(self, disease):
+        """Boolean mask over the survey rows that record `disease` in any slot"""
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[self.entry_rows[self.slices.get(disease, slice(0, 0))]] = True
+        return mask
+
+    def entries(self, row_mask, disease="All"):
+        """Long-format entries of the rows in `row_mask`, optionally only those for one disease"""
+        if disease == "All":
+            long = self.long
+        else:
+            long = self.long.iloc[self.slices.get(disease, slice(0, 0))]
+        return long[row_mask[long["row"].to_numpy(dtype=np.int64)]]
+
+def survey_filter_mask(df, crop, disease, start, end, disease_index):
+    """Boolean mask of the rows matching the Disease tracker filters (a disease may be in any slot)"""
+    mask = (df["date"] >= pd.to_datetime(start)) & (df["date"] <= pd.to_datetime(end))
+    if crop != "All":
+        mask &= df["crop"] == crop
+    mask = mask.to_numpy(dtype=bool, na_value=False)
+    if disease != "All":
+        mask = mask & disease_index.row_mask(disease)
+    return mask
+
+# -------------------------------
+# Carrying shared filtered views across submissions
+def record_matches_filter(record, crop, disease, start, end):
+    """Whether a submitted record would appear in the view for these filters"""
+    record_date = parse_survey_dates(pd.Series([record.get("date")], dtype=object)).iloc[0]
+    if pd.isna(record_date) or not (pd.to_datetime(start) <= record_date <= pd.to_datetime(end)):
+        return False
+    if crop != "All" and record.get("crop") != crop:
+        return False
+    if disease != "All" and disease not in (record.get(f"disease{slot}") for slot in (1, 2, 3)):
+        return False
+    return True
+
+def carry_forward_filtered_views(cache, df, version):
+    """Re-key views of the pre-submission version that no pending record matches (caller holds the lock)"""
+    base_version = cache["pending_since"]
+    if base_version is None or base_version == version:
+        return
+    base_keys = [key for key in cache["views"] if key[0] == base_version]
+    if not base_keys:
+        cache["pending_since"], cache["pending"] = None, []
+        return
+
+    # Carry forward only if the new version is exactly the base plus the submitted rows
+    sample_ids = [str(record.get("sample_id")) for record in cache["pending"]]
+    added = df[df["sample_id"].astype("string").isin(sample_ids)]
+    base_rows, base_sum = version_checksum(base_version)
+    added_rows, added_sum = version_checksum(data_version(added))
+    new_rows, new_sum = version_checksum(version)
+    if base_rows + added_rows != new_rows or (base_sum + added_sum) % 2 ** 64 != new_sum:
+        # Other rows changed too (an edit, a delete, another source); every old view is stale
+        cache["pending_since"], cache["pending"] = None, []
+        return
+
+    landed = set(added["sample_id"].astype(str))
+    landed_records = [record for record in cache["pending"] if str(record.get("sample_id")) in landed]
+    for key in base_keys:
+        view = cache["views"][key]
+        if any(record_matches_filter(record, *key[1:]) for record in landed_records):
+            continue
+        new_key = (version,) + key[1:]
+        del cache["views"][key]
+        if new_key in cache["views"]:
+            cache["bytes"] -= view["nbytes"]
+        else:
+            cache["views"][new_key] = dict(view, key=new_key)
+            cache["carried"] += 1
+
+    cache["pending"] = [record for record in cache["pending"] if str(record.get("sample_id")) not in landed]
+    cache["pending_since"] = version if cache["pending"] else None
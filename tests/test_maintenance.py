@@ -0,0 +1,97 @@
+import argparse
+import os
+
+import pandas as pd
+import pytest
+
+import maintenance
+from loadtest import FakeSpreadsheet
+from survey_store import SURVEY_COLUMNS, UPLOADS_DIR, get_local_data_path, rows_to_frame, season_worksheet
+
+
+def write_csv(rows):
+    os.makedirs(os.path.dirname(get_local_data_path()), exist_ok=True)
+    pd.DataFrame(rows).to_csv(get_local_data_path(), index=False)
+
+
+def read_text():
+    with open(get_local_data_path()) as f:
+        return f.read()
+
+
+def test_compact_keeps_stored_text(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_csv([
+        {"sample_id": "SARDI1", "date": "03/07/2025", "variety": "007", "field_type": "12", "latitude": "-36.67239756"},
+        {"sample_id": "SARDI1", "date": "03/07/2025", "variety": "007", "field_type": "12", "latitude": "-36.67239756"},
+    ])
+
+    maintenance.cmd_compact(argparse.Namespace())
+
+    assert read_text().splitlines() == [
+        "sample_id,date,variety,field_type,latitude",
+        "SARDI1,03/07/2025,007,12,-36.67239756",
+    ]
+
+
+def test_compact_is_idempotent_for_dates(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_csv([
+        {"sample_id": "SARDI2", "date": "03/07/2025", "latitude": -34.9, "longitude": 138.6},
+        {"sample_id": "SARDI1", "date": "2025-07-04", "latitude": -35.1, "longitude": 138.5},
+    ])
+
+    maintenance.cmd_compact(argparse.Namespace())
+    first = read_text()
+    maintenance.cmd_compact(argparse.Namespace())
+
+    assert read_text() == first
+    dates = pd.read_csv(get_local_data_path(), dtype=str).set_index("sample_id")["date"]
+    assert dates.to_dict() == {"SARDI1": "04/07/2025", "SARDI2": "03/07/2025"}
+
+
+def add_uploads(*names):
+    os.makedirs(UPLOADS_DIR, exist_ok=True)
+    for name in names:
+        with open(os.path.join(UPLOADS_DIR, name), "wb") as f:
+            f.write(b"jpg")
+
+
+def test_gc_uploads_refuses_when_no_record_refers_to_any_upload(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    add_uploads("a.jpg", "b.jpg")
+
+    with pytest.raises(SystemExit):
+        maintenance.cmd_gc_uploads(argparse.Namespace(apply=True, local_only=True))
+
+    assert sorted(os.listdir(UPLOADS_DIR)) == ["a.jpg", "b.jpg"]
+
+
+def test_gc_uploads_only_deletes_with_apply(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_csv([{"sample_id": "SARDI1", "date": "03/07/2025", "photo_filename": "a.jpg"}])
+    add_uploads("a.jpg", "b.jpg")
+
+    maintenance.cmd_gc_uploads(argparse.Namespace(apply=False, local_only=True))
+    assert sorted(os.listdir(UPLOADS_DIR)) == ["a.jpg", "b.jpg"]
+
+    maintenance.cmd_gc_uploads(argparse.Namespace(apply=True, local_only=True))
+    assert os.listdir(UPLOADS_DIR) == ["a.jpg"]
+
+
+def test_shard_writes_legacy_rows_by_column_name(monkeypatch):
+    spreadsheet = FakeSpreadsheet()
+    spreadsheet.sheet1.rows = [
+        ["date", "sample_id", "address", "crop"],
+        ["03/07/2024", "SARDI1", "1 Main Rd", "Wheat"],
+    ]
+    # The app already created this season's tab from a submission
+    season_worksheet(spreadsheet, 2024, SURVEY_COLUMNS)
+    monkeypatch.setattr(maintenance, "open_spreadsheet", lambda: spreadsheet)
+
+    maintenance.cmd_shard(argparse.Namespace(dry_run=False))
+
+    tab = rows_to_frame(spreadsheet.worksheet("Season 2024").get_all_values())
+    assert list(tab.columns) == SURVEY_COLUMNS + ["address"]
+    assert tab.loc[0, ["sample_id", "date", "crop", "address"]].tolist() == ["SARDI1", "03/07/2024", "Wheat", "1 Main Rd"]
+    assert spreadsheet.sheet1.get_all_values() == [["date", "sample_id", "address", "crop"]]
@@ -0,0 +1,16 @@
+import pandas as pd
+
+from reports import plan_reports
+
+
+def test_regions_that_slugify_alike_get_separate_report_paths():
+    df = pd.DataFrame({
+        "date": pd.to_datetime(["2025-07-03", "2025-07-04", "2025-07-05"]),
+        "survey_location": ["Clare", "clare", "Clare!"],
+        "crop": ["Wheat", "Wheat", "Wheat"],
+    })
+
+    paths = [job["path"] for job in plan_reports(df, "v1")]
+
+    assert len(paths) == 3
+    assert len(set(paths)) == 3
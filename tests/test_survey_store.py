@@ -0,0 +1,128 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from loadtest import FakeSpreadsheet
+from survey_store import (
+    append_local_values,
+    apply_survey_schema,
+    data_version,
+    layout_version,
+    read_local_values,
+    reconcile_surveys,
+    rows_to_frame,
+    serialize_survey_frame,
+    write_local_values,
+    write_sheet_rows_by_key,
+)
+
+
+def cloud_rows(n=2000):
+    """String rows as they come back from the Google Sheet"""
+    rng = np.random.default_rng(0)
+    dates = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 600, n), unit="D")
+    return pd.DataFrame({
+        "sample_id": [f"SARDI{25001 + i}" for i in range(n)],
+        "date": dates.strftime("%d/%m/%Y"),
+        "crop": rng.choice(["Wheat", "Barley", "Canola"], n),
+        "disease1": rng.choice(["Stripe rust", "Net blotch", "None"], n),
+        "severity1_percent": rng.integers(0, 101, n).astype(str),
+        "latitude": [f"{v:.6f}" for v in rng.uniform(-38, -26, n)],
+        "longitude": [f"{v:.6f}" for v in rng.uniform(129, 141, n)],
+        "field_notes": "",
+    })
+
+
+def test_serialized_coordinates_have_no_float32_noise():
+    df = apply_survey_schema(pd.DataFrame({
+        "sample_id": ["SARDI1", "SARDI2"],
+        "date": ["03/07/2025", ""],
+        "latitude": ["-34.9285", ""],
+        "longitude": ["138.6", "138.601"],
+    }))
+    assert df["longitude"].dtype == "float32"
+
+    stored = serialize_survey_frame(df)
+
+    assert stored["latitude"].tolist() == ["-34.928500", ""]
+    assert stored["longitude"].tolist() == ["138.600000", "138.601000"]
+    assert stored["date"].tolist()[0] == "03/07/2025"
+
+
+def test_local_save_round_trip_reconciles_as_identical(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cloud = cloud_rows()
+
+    # The app holds the typed frame and writes it back through save_local_data
+    write_local_values(apply_survey_schema(cloud))
+    plan = reconcile_surveys(read_local_values(), cloud)
+
+    assert plan["identical"] == len(cloud)
+    assert plan["local_only"].empty and plan["cloud_only"].empty and plan["changed_local"].empty
+
+
+def test_keyed_write_keeps_cells_outside_the_edit():
+    header = ["sample_id", "date", "crop", "disease1", "latitude", "longitude", "address", "grower"]
+    spreadsheet = FakeSpreadsheet()
+    spreadsheet.load([
+        header,
+        ["SARDI1", "03/07/2024", "Wheat", "Stripe rust", "-36.67239756", "140.1", "1 Main Rd", "Smith"],
+        ["SARDI2", "04/07/2024", "Barley", "Scald", "-35.5", "139.2", "2 High St", "Jones"],
+        ["SARDI3", "05/07/2024", "Oats", "None", "-35.6", "139.3", "3 Low Rd", "Brown"],
+    ])
+    before = apply_survey_schema(rows_to_frame(spreadsheet.worksheet("Season 2024").get_all_values()))
+    after = before.copy()
+    after["disease1"] = after["disease1"].cat.add_categories(["Leaf rust"])
+    after.loc[0, "disease1"] = "Leaf rust"
+    after.loc[1, "date"] = pd.Timestamp("2023-06-01")
+    after = after[after["sample_id"] != "SARDI3"]
+
+    edits = reconcile_surveys(after, before)
+    sheets = [(ws, ws.get_all_values()) for ws in spreadsheet.worksheets()]
+    forgotten = []
+    result = write_sheet_rows_by_key(
+        spreadsheet,
+        sheets,
+        pd.concat([edits["changed_local"], edits["local_only"]]),
+        edits["cloud_only"].index,
+        forget_seasons=forgotten.extend,
+    )
+
+    assert result == (1, 1, 1)
+    assert sorted(forgotten) == [2023, 2024]
+    tab_2024 = rows_to_frame(spreadsheet.worksheet("Season 2024").get_all_values())
+    assert tab_2024.to_dict("records") == [{
+        "sample_id": "SARDI1", "date": "03/07/2024", "crop": "Wheat", "disease1": "Leaf rust",
+        "latitude": "-36.67239756", "longitude": "140.1", "address": "1 Main Rd", "grower": "Smith",
+    }]
+    moved = rows_to_frame(spreadsheet.worksheet("Season 2023").get_all_values()).iloc[0]
+    assert moved[["sample_id", "date", "disease1", "address", "grower"]].tolist() == [
+        "SARDI2", "01/06/2023", "Scald", "2 High St", "Jones",
+    ]
+
+
+def test_layout_version_tracks_row_order():
+    df = apply_survey_schema(cloud_rows(50))
+    reordered = df.iloc[::-1].reset_index(drop=True)
+
+    # The additive checksum ignores order; position caches must not
+    assert data_version(reordered) == data_version(df)
+    assert layout_version(reordered) != layout_version(df)
+    assert layout_version(df.copy()) == layout_version(df)
+
+
+def test_concurrent_appends_keep_every_row_and_the_stored_text(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_local_values(pd.DataFrame({"sample_id": ["SARDI1"], "date": ["03/07/2024"], "variety": ["007"]}))
+
+    def save(i):
+        append_local_values(pd.DataFrame([{"sample_id": f"SARDI{i}", "date": "04/07/2024", "latitude": -35.5}]))
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(save, range(2, 42)))
+
+    local = read_local_values()
+    assert sorted(local["sample_id"]) == sorted(f"SARDI{i}" for i in range(1, 42))
+    assert local.loc[local["sample_id"] == "SARDI1", "variety"].tolist() == ["007"]
+    assert set(local.loc[local["sample_id"] != "SARDI1", "latitude"]) == {"-35.500000"}
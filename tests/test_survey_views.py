@@ -0,0 +1,140 @@
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from survey_store import apply_survey_schema, data_version
+from survey_views import (
+    DiseaseIndex,
+    SpatialGridIndex,
+    bucket_trend_rows,
+    carry_forward_filtered_views,
+    build_trend_view,
+    fold_trend_aggregates,
+    haversine_km,
+    survey_filter_mask,
+)
+
+
+def surveys(rows):
+    return apply_survey_schema(pd.DataFrame(
+        [{"sample_id": sid, "date": date, "crop": "Wheat", "disease1": "Stripe rust", "severity1_percent": sev}
+         for sid, date, sev in rows]
+    ))
+
+
+def test_trend_view_keeps_the_bucket_holding_the_range_start():
+    df = surveys([("S1", "15/01/2025", "10"), ("S2", "20/02/2025", "20"), ("S3", "10/03/2025", "30")])
+
+    view = build_trend_view(bucket_trend_rows(df), "M", "All", "All", pd.Timestamp("2025-01-10"), pd.Timestamp("2025-03-31"), 1)
+
+    assert view["period"].dt.month.tolist() == [1, 2, 3]
+    assert view["mean_severity"].tolist() == [10.0, 20.0, 30.0]
+
+
+def test_folding_new_submissions_matches_a_full_rebuild():
+    df = surveys([("S1", "15/01/2025", "10"), ("S2", "20/02/2025", "20")])
+    grown = pd.concat([df, surveys([("S3", "21/02/2025", "40")])], ignore_index=True)
+    entries = OrderedDict()
+
+    fold_trend_aggregates(entries, df, data_version(df), 4)
+    folded = fold_trend_aggregates(entries, grown, data_version(grown), 4)
+
+    rebuilt = bucket_trend_rows(grown)
+    for freq, tables in rebuilt.items():
+        for name, table in tables.items():
+            pd.testing.assert_frame_equal(folded[freq][name].sort_index(), table.sort_index(), check_dtype=False)
+
+
+def test_edited_rows_force_a_rebuild_instead_of_a_fold():
+    df = surveys([("S1", "15/01/2025", "10"), ("S2", "20/02/2025", "20")])
+    edited = pd.concat([df, surveys([("S3", "21/02/2025", "40")])], ignore_index=True)
+    edited.loc[0, "severity1_percent"] = 90
+    entries = OrderedDict()
+
+    fold_trend_aggregates(entries, df, data_version(df), 4)
+    aggs = fold_trend_aggregates(entries, edited, data_version(edited), 4)
+
+    january = aggs["M"]["reports"].xs(pd.Timestamp("2025-01-01"), level="period")
+    assert january["severity_sum"].sum() == 90
+
+
+def test_spatial_index_matches_a_brute_force_radius_search():
+    rng = np.random.default_rng(0)
+    n = 3000
+    df = pd.DataFrame({
+        "latitude": rng.uniform(-36, -33, n).astype("float32"),
+        "longitude": rng.uniform(137, 140, n).astype("float32"),
+        "date": pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 365, n), unit="D"),
+    })
+    df.loc[:9, ["latitude", "longitude"]] = 0.0  # no GPS fix
+    index = SpatialGridIndex(df)
+
+    positions, distances = index.query(-34.9, 138.6, 40, since=pd.Timestamp("2025-06-01"))
+
+    all_distances = haversine_km(-34.9, 138.6, df["latitude"].to_numpy("float64"), df["longitude"].to_numpy("float64"))
+    expected = np.flatnonzero((all_distances <= 40) & (df["date"] >= "2025-06-01").to_numpy())
+    assert len(index) == n - 10
+    assert sorted(positions.tolist()) == expected.tolist()
+    assert np.all(np.diff(distances) >= 0)
+    np.testing.assert_allclose(distances, all_distances[positions])
+
+
+def test_disease_filter_matches_every_slot():
+    df = apply_survey_schema(pd.DataFrame({
+        "sample_id": ["S1", "S2", "S3", "S4"],
+        "date": ["03/07/2025", "04/07/2025", "05/07/2025", "06/07/2025"],
+        "crop": ["Wheat", "Wheat", "Barley", "Wheat"],
+        "disease1": ["Stripe rust", "Septoria", "Net blotch", "Septoria"],
+        "disease2": ["", "Stripe rust", "", ""],
+        "disease3": ["", "", "Stripe rust", ""],
+        "severity1_percent": ["10", "20", "30", "40"],
+        "severity2_percent": ["", "25", "", ""],
+        "severity3_percent": ["", "", "35", ""],
+    }))
+    index = DiseaseIndex(df)
+
+    mask = survey_filter_mask(df, "All", "Stripe rust", "2025-07-01", "2025-07-31", index)
+    entries = index.entries(mask, "Stripe rust")
+
+    assert mask.tolist() == [True, True, True, False]
+    assert entries["row"].tolist() == [0, 1, 2]
+    assert entries["severity"].tolist() == [10, 25, 35]
+    assert survey_filter_mask(df, "Wheat", "Stripe rust", "2025-07-01", "2025-07-31", index).tolist() == [True, True, False, False]
+    assert set(index.entries(mask)["disease"]) == {"Stripe rust", "Septoria", "Net blotch"}
+
+
+def view_cache(version, filters, pending):
+    views = OrderedDict(((version,) + f, {"key": (version,) + f, "nbytes": 1}) for f in filters)
+    return {"views": views, "bytes": len(views), "carried": 0, "pending_since": version, "pending": pending}
+
+
+def test_submission_carries_forward_only_the_views_it_cannot_appear_in():
+    df = surveys([("S1", "15/01/2025", "10"), ("S2", "20/02/2025", "20")])
+    record = {"sample_id": "S3", "date": "21/02/2025", "crop": "Wheat", "disease1": "Stripe rust"}
+    grown = pd.concat([df, surveys([("S3", "21/02/2025", "40")])], ignore_index=True)
+    base, new = data_version(df), data_version(grown)
+    february = ("All", "All", "2025-02-01", "2025-02-28")
+    january = ("All", "All", "2025-01-01", "2025-01-31")
+    barley = ("Barley", "All", "2025-02-01", "2025-02-28")
+    cache = view_cache(base, [february, january, barley], [record])
+
+    carry_forward_filtered_views(cache, grown, new)
+
+    assert {key for key in cache["views"] if key[0] == new} == {(new,) + january, (new,) + barley}
+    assert cache["carried"] == 2
+    assert cache["pending_since"] is None and cache["pending"] == []
+
+
+def test_other_changes_drop_every_view_of_the_old_version():
+    df = surveys([("S1", "15/01/2025", "10"), ("S2", "20/02/2025", "20")])
+    record = {"sample_id": "S3", "date": "21/02/2025", "crop": "Wheat", "disease1": "Stripe rust"}
+    grown = pd.concat([df, surveys([("S3", "21/02/2025", "40")])], ignore_index=True)
+    grown.loc[0, "severity1_percent"] = 90
+    january = ("All", "All", "2025-01-01", "2025-01-31")
+    cache = view_cache(data_version(df), [january], [record])
+
+    carry_forward_filtered_views(cache, grown, data_version(grown))
+
+    assert set(cache["views"]) == {(data_version(df),) + january}
+    assert cache["carried"] == 0 and cache["pending"] == []